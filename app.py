@@ -1,12 +1,24 @@
 import streamlit as st
-import json
 from datetime import datetime
 import uuid
+from collections import deque
+from itertools import islice
+import time
 from core.chatbot_framework import ChatbotFramework
 from utils.sheets_api import SheetsAPI
-from utils.formatter import format_message
+from utils.formatter import format_message_content
+from utils import json_utils
 import os
 
+# Number of messages rendered per "page" of chat history
+CHAT_WINDOW_SIZE = 50
+
+# Messages kept in memory per session; older ones remain in Google Sheets
+MAX_MESSAGES = 2000
+
+# Minimum seconds between placeholder updates while a reply streams in
+STREAM_RENDER_INTERVAL = 0.075
+
 # Page configuration
 st.set_page_config(
     page_title="Career Guidance Chatbot",
@@ -16,7 +28,7 @@ st.set_page_config(
 )
 
 # Custom CSS for better UI
-st.markdown("""
+CUSTOM_CSS = """
 <style>
     .chat-message {
         padding: 1rem;
@@ -49,61 +61,94 @@ st.markdown("""
         margin-top: 2rem;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# Collapse whitespace once at import so each rerun sends the smallest payload
+CUSTOM_CSS = " ".join(CUSTOM_CSS.split())
+
+@st.cache_resource
+def get_chatbot():
+    """Create the chatbot framework once and share it across sessions"""
+    return ChatbotFramework()
+
+@st.cache_resource
+def get_sheets_api():
+    """Create the Google Sheets connection once and share it across sessions"""
+    return SheetsAPI()
 
 def initialize_session_state():
     """Initialize session state variables"""
     if 'messages' not in st.session_state:
-        st.session_state.messages = []
+        st.session_state.messages = deque(maxlen=MAX_MESSAGES)
+    if 'window_size' not in st.session_state:
+        st.session_state.window_size = CHAT_WINDOW_SIZE
     if 'session_id' not in st.session_state:
         st.session_state.session_id = str(uuid.uuid4())
     if 'chatbot' not in st.session_state:
-        st.session_state.chatbot = ChatbotFramework()
+        st.session_state.chatbot = get_chatbot()
     if 'sheets_api' not in st.session_state:
         try:
-            st.session_state.sheets_api = SheetsAPI()
+            st.session_state.sheets_api = get_sheets_api()
         except Exception as e:
             st.error(f"Failed to initialize Google Sheets connection: {e}")
             st.session_state.sheets_api = None
 
-def save_message_to_sheets(role, content, metadata=None):
-    """Save message to Google Sheets"""
+def render_message_html(message):
+    """Build the HTML block for a single chat message"""
+    if message["role"] == "user":
+        css_class, header = "user-message", "👤 You"
+    else:
+        css_class, header = "bot-message", "🤖 Career Bot"
+    
+    return (
+        f'<div class="chat-message {css_class}">'
+        f'<div class="message-header">{header}</div>'
+        f'<div>{format_message_content(message["content"])}</div>'
+        f'<div class="timestamp">{message.get("timestamp", "")}</div>'
+        '</div>'
+    )
+
+def create_message(role, content, created_at=None):
+    """Create a chat message with its display HTML pre-rendered"""
+    message = {
+        "role": role,
+        "content": content,
+        "timestamp": (created_at or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+    }
+    message["html"] = render_message_html(message)
+    return message
+
+def save_message_to_sheets(role, content, metadata=None, created_at=None):
+    """Queue a message to be saved to Google Sheets in the background"""
     if st.session_state.sheets_api:
-        try:
-            message_data = {
-                'session_id': st.session_state.session_id,
-                'timestamp': datetime.now().isoformat(),
-                'role': role,
-                'content': content,
-                'metadata': json.dumps(metadata) if metadata else ''
-            }
-            st.session_state.sheets_api.append_message(message_data)
-        except Exception as e:
-            st.error(f"Failed to save message: {e}")
+        st.session_state.sheets_api.enqueue_message({
+            'session_id': st.session_state.session_id,
+            'timestamp': (created_at or datetime.now()).isoformat(),
+            'role': role,
+            'content': content,
+            'metadata': json_utils.dumps(metadata).decode('utf-8') if metadata else ''
+        })
 
 def display_chat_history():
-    """Display chat messages"""
-    for message in st.session_state.messages:
-        role = message["role"]
-        content = message["content"]
-        timestamp = message.get("timestamp", "")
-        
-        if role == "user":
-            st.markdown(f"""
-            <div class="chat-message user-message">
-                <div class="message-header">👤 You</div>
-                <div>{content}</div>
-                <div class="timestamp">{timestamp}</div>
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown(f"""
-            <div class="chat-message bot-message">
-                <div class="message-header">🤖 Career Bot</div>
-                <div>{content}</div>
-                <div class="timestamp">{timestamp}</div>
-            </div>
-            """, unsafe_allow_html=True)
+    """Display the most recent chat messages"""
+    messages = st.session_state.messages
+    window_size = st.session_state.window_size
+    
+    # Only the last window_size messages are rendered; older ones stay in memory
+    hidden_count = len(messages) - window_size
+    if hidden_count > 0:
+        if st.button(f"⬆️ Load earlier messages ({hidden_count} hidden)"):
+            st.session_state.window_size += CHAT_WINDOW_SIZE
+            st.rerun()
+    
+    # Message HTML is built once at creation, so this is a single markdown call
+    st.markdown(
+        "".join(
+            message.get("html") or render_message_html(message)
+            for message in islice(messages, max(hidden_count, 0), None)
+        ),
+        unsafe_allow_html=True
+    )
 
 def export_chat_history():
     """Export chat history functionality"""
@@ -112,55 +157,101 @@ def export_chat_history():
         export_data = {
             'session_id': st.session_state.session_id,
             'export_timestamp': datetime.now().isoformat(),
-            'messages': st.session_state.messages
+            'messages': [
+                {key: value for key, value in message.items() if key != 'html'}
+                for message in st.session_state.messages
+            ]
         }
         
-        # Convert to JSON string
-        json_str = json.dumps(export_data, indent=2)
+        # Serialize straight to bytes for the download
+        json_bytes = json_utils.dumps(export_data, indent=True)
         
         # Create download button
-        st.download_button(
+        exported = st.download_button(
             label="📥 Export Chat History (JSON)",
-            data=json_str,
+            data=json_bytes,
             file_name=f"chat_history_{st.session_state.session_id[:8]}.json",
             mime="application/json"
         )
         
-        # Also save to sheets for history
-        if st.session_state.sheets_api:
+        # Also save to sheets for history when the export is downloaded
+        if exported and st.session_state.sheets_api:
             try:
+                st.session_state.sheets_api.flush()
                 st.session_state.sheets_api.save_chat_export(export_data)
                 st.success("Chat history saved to Google Sheets!")
             except Exception as e:
                 st.warning(f"Could not save to sheets: {e}")
 
+def _handle_turn(prompt: str, container) -> None:
+    """
+    Record a user message, stream the bot reply and persist both.
+    
+    Args:
+        prompt: The user's message
+        container: Streamlit container the new messages are rendered into
+    """
+    # Add user message to chat history and show it below the existing ones
+    created_at = datetime.now()
+    user_message = create_message("user", prompt, created_at)
+    st.session_state.messages.append(user_message)
+    with container:
+        st.markdown(user_message["html"], unsafe_allow_html=True)
+        reply_placeholder = st.empty()
+    
+    # Save user message to sheets
+    save_message_to_sheets("user", prompt, created_at=created_at)
+    
+    # Stream the bot response into its placeholder instead of rerunning the script
+    try:
+        ai_reply = ""
+        last_render = time.monotonic()
+        with st.spinner("Thinking..."):
+            for chunk in st.session_state.chatbot.stream_message(
+                prompt,
+                st.session_state.session_id
+            ):
+                ai_reply += chunk
+                
+                # Batch chunks so the browser gets at most ~13 updates a second
+                now = time.monotonic()
+                if now - last_render >= STREAM_RENDER_INTERVAL:
+                    reply_placeholder.markdown(
+                        render_message_html({"role": "assistant", "content": ai_reply}),
+                        unsafe_allow_html=True
+                    )
+                    last_render = now
+        
+        # Add bot response to chat history
+        created_at = datetime.now()
+        bot_message = create_message("assistant", ai_reply, created_at)
+        st.session_state.messages.append(bot_message)
+        
+        # Save bot message to sheets
+        save_message_to_sheets("assistant", ai_reply, created_at=created_at)
+        
+    except Exception as e:
+        st.error(f"Sorry, I encountered an error: {e}")
+        bot_message = create_message(
+            "assistant",
+            "I apologize, but I'm experiencing technical difficulties. Please try again."
+        )
+        st.session_state.messages.append(bot_message)
+    
+    reply_placeholder.markdown(bot_message["html"], unsafe_allow_html=True)
+
 def main():
     """Main application function"""
     initialize_session_state()
     
+    # Streamlit drops elements that a run does not emit, so the styles are
+    # re-sent on every rerun rather than only on first load
+    st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+    
     # Header
     st.title("🎯 Career Guidance Chatbot")
     st.markdown("Get personalized career advice and explore your professional path!")
     
-    # Sidebar with session info and controls
-    with st.sidebar:
-        st.header("Session Info")
-        st.write(f"**Session ID:** {st.session_state.session_id[:8]}...")
-        st.write(f"**Messages:** {len(st.session_state.messages)}")
-        
-        if st.button("🔄 New Session"):
-            st.session_state.messages = []
-            st.session_state.session_id = str(uuid.uuid4())
-            st.session_state.chatbot = ChatbotFramework()
-            st.rerun()
-        
-        st.markdown("---")
-        st.markdown("### 📤 Export")
-        if st.session_state.messages:
-            export_chat_history()
-        else:
-            st.info("Start a conversation to enable export")
-    
     # Main chat interface
     col1, col2 = st.columns([3, 1])
     
@@ -172,48 +263,7 @@ def main():
         
         # Chat input
         if prompt := st.chat_input("Ask me about career guidance..."):
-            # Add user message to chat history
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            user_message = {
-                "role": "user",
-                "content": prompt,
-                "timestamp": timestamp
-            }
-            st.session_state.messages.append(user_message)
-            
-            # Save user message to sheets
-            save_message_to_sheets("user", prompt)
-            
-            # Get bot response
-            try:
-                with st.spinner("Thinking..."):
-                    ai_reply = st.session_state.chatbot.process_message(
-                        prompt,
-                        st.session_state.session_id
-                    )
-                
-                # Add bot response to chat history
-                bot_message = {
-                    "role": "assistant",
-                    "content": ai_reply,
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
-                st.session_state.messages.append(bot_message)
-                
-                # Save bot message to sheets
-                save_message_to_sheets("assistant", ai_reply)
-                
-            except Exception as e:
-                st.error(f"Sorry, I encountered an error: {e}")
-                error_message = {
-                    "role": "assistant",
-                    "content": "I apologize, but I'm experiencing technical difficulties. Please try again.",
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
-                st.session_state.messages.append(error_message)
-            
-            # Rerun to display new messages
-            st.rerun()
+            _handle_turn(prompt, chat_container)
     
     with col2:
         # Quick actions and suggestions
@@ -229,44 +279,28 @@ def main():
         
         for prompt in quick_prompts:
             if st.button(prompt, key=f"quick_{prompt}"):
-                # Simulate clicking the prompt
-                st.session_state.temp_prompt = prompt
-                st.rerun()
+                # Process the quick prompt same as manual input
+                _handle_turn(prompt, chat_container)
+    
+    # Sidebar is rendered last so its counts and export include this run's turn
+    with st.sidebar:
+        st.header("Session Info")
+        st.write(f"**Session ID:** {st.session_state.session_id[:8]}...")
+        st.write(f"**Messages:** {len(st.session_state.messages)}")
         
-        # Handle quick prompt selection
-        if hasattr(st.session_state, 'temp_prompt'):
-            prompt = st.session_state.temp_prompt
-            del st.session_state.temp_prompt
-            
-            # Process the quick prompt same as manual input
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            user_message = {
-                "role": "user", 
-                "content": prompt,
-                "timestamp": timestamp
-            }
-            st.session_state.messages.append(user_message)
-            save_message_to_sheets("user", prompt)
-            
-            try:
-                with st.spinner("Thinking..."):
-                    ai_reply = st.session_state.chatbot.process_message(
-                        prompt,
-                        st.session_state.session_id
-                    )
-                
-                bot_message = {
-                    "role": "assistant",
-                    "content": ai_reply,
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
-                st.session_state.messages.append(bot_message)
-                save_message_to_sheets("assistant", ai_reply)
-                
-            except Exception as e:
-                st.error(f"Error: {e}")
-            
+        if st.button("🔄 New Session"):
+            st.session_state.chatbot.reset_session(st.session_state.session_id)
+            st.session_state.messages = deque(maxlen=MAX_MESSAGES)
+            st.session_state.window_size = CHAT_WINDOW_SIZE
+            st.session_state.session_id = str(uuid.uuid4())
             st.rerun()
+        
+        st.markdown("---")
+        st.markdown("### 📤 Export")
+        if st.session_state.messages:
+            export_chat_history()
+        else:
+            st.info("Start a conversation to enable export")
 
 if __name__ == "__main__":
     main()
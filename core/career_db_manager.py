@@ -1,9 +1,19 @@
 # core/career_db_manager.py
 # Person B (career DB for rule engine) - Database management utilities
 
-import pandas as pd
-import json
 from typing import Dict, Any
+from utils import json_utils
+
+def _is_invalid_json(value: Any) -> bool:
+    """Return True if a string cell does not contain valid JSON."""
+    # Non-string cells (e.g. values pandas already parsed) are not checked
+    if not isinstance(value, str):
+        return False
+    try:
+        json_utils.loads(value)
+        return False
+    except ValueError:
+        return True
 
 class CareerDatabaseManager:
     """Utility class to manage and validate the career database."""
@@ -25,6 +35,11 @@ class CareerDatabaseManager:
 
     def validate_csv_structure(self) -> Dict[str, Any]:
         """Validate the CSV structure and return validation results."""
+        # Imported here so loading this module stays cheap for callers
+        # that never validate the database
+        import numpy as np
+        import pandas as pd
+        
         results = {
             'valid': True,
             'errors': [],
@@ -60,14 +75,18 @@ class CareerDatabaseManager:
             results['valid'] = False
             results['errors'].append(f"Duplicate career IDs found: {duplicate_ids}")
 
+        # Row-aligned title array; the checks below index it with boolean masks
+        # instead of slicing a new DataFrame per check
+        titles = df['title'].to_numpy()
+
         # 3. Validate and convert numeric fields *before* using them
         for field in self.numeric_fields:
             # Coerce non-numeric values to NaN (Not a Number)
-            original_type = df[field].dtype
             df[field] = pd.to_numeric(df[field], errors='coerce')
-            if df[field].isnull().any():
+            missing_mask = np.isnan(df[field].to_numpy(dtype=float))
+            if missing_mask.any():
                 results['valid'] = False
-                invalid_rows = df[df[field].isnull()]['title'].tolist()
+                invalid_rows = titles[missing_mask].tolist()
                 results['errors'].append(f"Non-numeric or empty values in '{field}': {invalid_rows}")
         
         # If there were numeric conversion errors, stop before doing calculations
@@ -76,27 +95,22 @@ class CareerDatabaseManager:
 
         # 4. Validate JSON fields
         for field in self.json_fields:
-            invalid_json_rows = []
-            for index, value in df[field].items():
-                try:
-                    # Check if it's already a list/dict (pandas can auto-parse sometimes)
-                    if isinstance(value, (str)):
-                        json.loads(value)
-                except (json.JSONDecodeError, TypeError):
-                    invalid_json_rows.append(df.loc[index, 'title'])
+            invalid_mask = df[field].map(_is_invalid_json)
+            invalid_json_rows = titles[invalid_mask.to_numpy(dtype=bool)].tolist()
             if invalid_json_rows:
                 results['valid'] = False
                 results['errors'].append(f"Invalid JSON format in '{field}': {invalid_json_rows}")
 
         # 5. Perform logical checks on now-validated numeric data
         # Validate ranges (salary_min < salary_max)
-        salary_issues = df[df['salary_min'] >= df['salary_max']]['title'].tolist()
+        salary_issues = titles[df['salary_min'].to_numpy() >= df['salary_max'].to_numpy()].tolist()
         if salary_issues:
             results['warnings'].append(f"Salary min is greater than or equal to max for: {salary_issues}")
 
         # Validate scales (1-10)
         for field in ['growth_potential', 'job_market_demand']:
-            out_of_range = df[~df[field].between(1, 10)]['title'].tolist()
+            values = df[field].to_numpy()
+            out_of_range = titles[(values < 1) | (values > 10)].tolist()
             if out_of_range:
                 results['warnings'].append(f"Values in '{field}' are outside the valid range of 1-10 for: {out_of_range}")
         
@@ -1,14 +1,81 @@
-from typing import Dict, Any
+from typing import Dict, Any, FrozenSet, Iterator
 import logging
+import random
+import re
 from datetime import datetime
-from core.rule_engine import RuleEngine
+from functools import lru_cache
+from core.rule_engine import get_engine as get_rule_engine
 
-# Import will be available when Person C creates the LLMEngine
-try:
-    from core.llm_engine import LLMEngine
-    LLM_AVAILABLE = True
-except ImportError:
-    LLM_AVAILABLE = False
+@lru_cache(maxsize=1)
+def _load_llm_engine():
+    """
+    Import the LLM engine module on first use so the LLM client stack is only
+    loaded when a ChatbotFramework is actually created.
+    
+    Returns:
+        The shared LLMEngine factory, or None if it cannot be imported
+    """
+    try:
+        from core.llm_engine import get_engine
+        return get_engine
+    except ImportError:
+        return None
+
+# Keyword groups used for routing, in priority order
+RULE_BASED_KEYWORDS = frozenset({'find careers', 'recommend', 'suggest a job', 'based on my skills', 'career path', 'job recommendation'})
+GREETING_KEYWORDS = frozenset({'hello', 'hi', 'hey', 'greetings'})
+CAREER_KEYWORDS = frozenset({'career', 'job', 'work', 'profession'})
+SKILLS_KEYWORDS = frozenset({'skills', 'abilities', 'learn', 'develop'})
+RESUME_KEYWORDS = frozenset({'resume', 'cv', 'application'})
+SALARY_KEYWORDS = frozenset({'salary', 'pay', 'money', 'compensation'})
+FAREWELL_KEYWORDS = frozenset({'thanks', 'thank you', 'bye', 'goodbye'})
+
+KEYWORD_GROUPS = (
+    ('rule', RULE_BASED_KEYWORDS),
+    ('greeting', GREETING_KEYWORDS),
+    ('career', CAREER_KEYWORDS),
+    ('skills', SKILLS_KEYWORDS),
+    ('resume', RESUME_KEYWORDS),
+    ('salary', SALARY_KEYWORDS),
+    ('farewell', FAREWELL_KEYWORDS),
+)
+
+# Canned replies used without an LLM, keyed by keyword group in priority order
+FALLBACK_REPLIES = {
+    'greeting': "Hello! I'm your career guidance assistant. How can I help you with your professional journey today?",
+    'career': "I'd be happy to help with career advice! To give you the best guidance, could you tell me more about your background, interests, or current situation?",
+    'skills': "Developing the right skills is crucial for career success! What field or role are you targeting? I can suggest relevant skills to focus on.",
+    'resume': "I'd be glad to help with your resume! Are you writing a new resume, updating an existing one, or targeting a specific role?",
+    'salary': "Salary information is important for career decisions! What role or field are you curious about? Location also affects compensation.",
+    'farewell': "You're welcome! Best of luck with your career journey. Feel free to come back anytime for more guidance!",
+}
+
+# Replies used without an LLM when no keyword group matches
+GENERIC_FALLBACK_REPLIES = (
+    "I'm here to help with your career questions! Could you tell me more about what you're looking for?",
+    "I'd be happy to provide career guidance. What specific area would you like to explore?",
+    "Let me assist you with your career journey. What's your main concern or goal right now?",
+    "I'm ready to help with career advice! What would you like to know?",
+)
+
+# Single precompiled pattern that tags every keyword group in one scan.
+# Lookaheads keep matches zero-width so overlapping keywords are still
+# found, and at any position the higher-priority group wins. Matching is
+# case-insensitive so messages are scanned without a lowercased copy.
+_KEYWORD_ROUTER = re.compile('|'.join(
+    f"(?=(?P<{tag}>{'|'.join(re.escape(keyword) for keyword in sorted(keywords))}))"
+    for tag, keywords in KEYWORD_GROUPS
+), re.IGNORECASE)
+
+@lru_cache(maxsize=1024)
+def _route_keyword_tags(text: str) -> FrozenSet[str]:
+    """
+    Tag a message with the keyword groups it contains.
+    
+    Short messages such as greetings and thanks repeat often, so results
+    (including messages that match no group) are cached.
+    """
+    return frozenset(match.lastgroup for match in _KEYWORD_ROUTER.finditer(text))
 
 class ChatbotFramework:
     """
@@ -22,14 +89,15 @@ class ChatbotFramework:
         """Initialize the chatbot framework"""
         self.logger = logging.getLogger(__name__)
         
-        # Initialize the RuleEngine first
-        self.rule_engine = RuleEngine()
+        # Initialize the RuleEngine first (shared, the career data is read-only)
+        self.rule_engine = get_rule_engine()
         
         # Try to initialize LLMEngine
         self.engine = None
-        if LLM_AVAILABLE:
+        get_engine = _load_llm_engine()
+        if get_engine is not None:
             try:
-                self.engine = LLMEngine()
+                self.engine = get_engine()
                 self.logger.info("LLMEngine initialized successfully")
             except Exception as e:
                 self.logger.warning(f"LLMEngine initialization failed: {e}")
@@ -39,78 +107,83 @@ class ChatbotFramework:
             self.logger.warning("LLMEngine not available, using fallback responses")
         
         # Simple fallback responses when LLMEngine is not available
-        self.fallback_responses = [
-            "I'm here to help with your career questions! Could you tell me more about what you're looking for?",
-            "I'd be happy to provide career guidance. What specific area would you like to explore?",
-            "Let me assist you with your career journey. What's your main concern or goal right now?",
-            "I'm ready to help with career advice! What would you like to know?",
-        ]
+        self.fallback_responses = GENERIC_FALLBACK_REPLIES
     
     def process_message(self, user_input: str, session_id: str) -> str:
         """
         Process user message and route to the appropriate engine.
         """
+        return "".join(self.stream_message(user_input, session_id))
+    
+    def stream_message(self, user_input: str, session_id: str) -> Iterator[str]:
+        """
+        Process user message and stream the reply as it is generated.
+        
+        Rule-based and fallback replies arrive as a single chunk; LLM replies
+        are yielded piece by piece.
+        
+        Args:
+            user_input: The user's message
+            session_id: A unique identifier for the user's session
+            
+        Yields:
+            Pieces of the reply as strings
+        """
         # Simple keyword-based intent detection
-        user_input_lower = user_input.lower()
-        rule_based_keywords = ['find careers', 'recommend', 'suggest a job', 'based on my skills', 'career path', 'job recommendation']
+        tags = self._match_keyword_tags(user_input)
 
         # If a keyword is found, use the RuleEngine. Otherwise, use the LLM.
-        if any(keyword in user_input_lower for keyword in rule_based_keywords):
+        if 'rule' in tags:
             try:
                 self.logger.info("Routing to RuleEngine.")
-                return self.rule_engine.get_recommendations(user_input)
+                reply = self.rule_engine.get_recommendations(user_input)
             except Exception as e:
                 self.logger.error(f"Error in RuleEngine: {e}")
-                return "I had an issue finding specific recommendations, but I can still help."
+                reply = "I had an issue finding specific recommendations, but I can still help."
+            yield reply
+            return
 
         # Fallback to LLMEngine for conversational queries
         try:
-            if self.engine and LLM_AVAILABLE:
+            if self.engine:
                 self.logger.info("Routing to LLMEngine.")
-                return self.engine.generate_response(session_id, user_input)
+                yield from self.engine.stream_response(session_id, user_input)
             else:
-                return self._get_fallback_response(user_input)
+                yield self._get_fallback_response(tags)
                 
         except Exception as e:
             self.logger.error(f"Error processing message with LLM: {e}")
-            return "I apologize, but I'm experiencing technical difficulties. Please try again."
+            yield "I apologize, but I'm experiencing technical difficulties. Please try again."
+    
+    def _match_keyword_tags(self, text: str) -> FrozenSet[str]:
+        """Return the keyword groups present in the text"""
+        return _route_keyword_tags(text)
     
-    def _get_fallback_response(self, user_input: str) -> str:
+    def _get_fallback_response(self, tags: FrozenSet[str]) -> str:
         """
         Generate a fallback response when LLMEngine is not available.
-        """
-        import random
-        
-        # Basic keyword detection for simple responses
-        user_input_lower = user_input.lower()
-        
-        if any(word in user_input_lower for word in ['hello', 'hi', 'hey', 'greetings']):
-            return "Hello! I'm your career guidance assistant. How can I help you with your professional journey today?"
-        
-        elif any(word in user_input_lower for word in ['career', 'job', 'work', 'profession']):
-            return "I'd be happy to help with career advice! To give you the best guidance, could you tell me more about your background, interests, or current situation?"
         
-        elif any(word in user_input_lower for word in ['skills', 'abilities', 'learn', 'develop']):
-            return "Developing the right skills is crucial for career success! What field or role are you targeting? I can suggest relevant skills to focus on."
-        
-        elif any(word in user_input_lower for word in ['resume', 'cv', 'application']):
-            return "I'd be glad to help with your resume! Are you writing a new resume, updating an existing one, or targeting a specific role?"
-        
-        elif any(word in user_input_lower for word in ['salary', 'pay', 'money', 'compensation']):
-            return "Salary information is important for career decisions! What role or field are you curious about? Location also affects compensation."
-        
-        elif any(word in user_input_lower for word in ['thanks', 'thank you', 'bye', 'goodbye']):
-            return "You're welcome! Best of luck with your career journey. Feel free to come back anytime for more guidance!"
+        Args:
+            tags: Keyword groups already matched in the user's message
+        """
+        for tag, response in FALLBACK_REPLIES.items():
+            if tag in tags:
+                return response
         
-        else:
-            return random.choice(self.fallback_responses)
+        return random.choice(self.fallback_responses)
+    
+    def clear_caches(self):
+        """Clear the keyword routing cache and any cached LLM responses"""
+        _route_keyword_tags.cache_clear()
+        if self.engine:
+            self.engine.clear_response_cache()
     
     def health_check(self) -> Dict[str, Any]:
         """Check the health of the chatbot framework"""
         return {
             "rule_engine_available": self.rule_engine is not None,
             "llm_engine_available": self.engine is not None,
-            "llm_available": LLM_AVAILABLE,
+            "llm_available": _load_llm_engine() is not None,
             "fallback_responses_count": len(self.fallback_responses)
         }
     
@@ -121,7 +194,8 @@ class ChatbotFramework:
         Args:
             session_id: Session to reset
         """
-        # The LLMEngine handles its own session management
-        # This method is here for compatibility if needed
-        self.logger.info(f"Session reset requested for {session_id}")
-        pass
+        # The framework is shared across sessions, so drop the stored
+        # conversation history instead of keeping it for the process lifetime
+        if self.engine:
+            self.engine.clear_session(session_id)
+        self.logger.info("Session reset requested for %s", session_id)
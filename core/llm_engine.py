@@ -1,11 +1,70 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+import openai
 import streamlit as st
 from langchain_openai import ChatOpenAI
 from langchain_core.runnables import RunnableWithMessageHistory
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langchain_core.chat_history import InMemoryChatMessageHistory
 from core.prompts import CAREER_ADVISOR_PROMPT
 from utils.errors import LLMResponseError
 
+# Opening questions (asked with no history yet, e.g. the quick-action prompts)
+# are answered from memory for this long, across sessions
+RESPONSE_CACHE_TTL = 3600
+RESPONSE_CACHE_SIZE = 2048
+
+# Chat histories kept in memory; the least recently used session is dropped first
+MAX_CHAT_SESSIONS = 1024
+
+# Messages kept per session history and sent to the model as chat_history
+MAX_HISTORY_MESSAGES = 20
+
+# Trailing punctuation ignored when matching inputs against the response cache;
+# punctuation inside the input is kept so "C++" and "C" stay distinct
+_CACHE_KEY_TRAILING_PUNCTUATION = "?!. "
+
+# The project's .env file, found regardless of the directory the app is launched from
+_DOTENV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+
+def _load_dotenv_if_needed():
+    """
+    Loads the project .env file, but only when OPENAI_API_KEY is not already set.
+
+    Skips the file read and the python-dotenv import when the key comes from
+    the environment or Streamlit secrets, or when no .env file exists.
+    """
+    if os.environ.get('OPENAI_API_KEY') or not os.path.exists(_DOTENV_PATH):
+        return
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv(_DOTENV_PATH)
+
+class BoundedChatMessageHistory(InMemoryChatMessageHistory):
+    """
+    In-memory chat history that keeps only the most recent messages.
+
+    Bounds both per-session memory and the size of every prompt, which
+    otherwise grows with each turn of a long conversation. History is trimmed
+    in blocks, back to about half the limit, so the prompt prefix stays the
+    same (and cache-eligible) between trims instead of shifting every turn.
+    """
+
+    def add_message(self, message: BaseMessage) -> None:
+        self.messages.append(message)
+        if len(self.messages) > MAX_HISTORY_MESSAGES:
+            # Drop whole question/answer pairs so the history still opens with a question
+            drop = len(self.messages) - MAX_HISTORY_MESSAGES // 2
+            del self.messages[:drop - drop % 2]
+
 class LLMEngine:
     def __init__(self):
         try:
@@ -15,12 +74,12 @@ class LLMEngine:
                 if hasattr(st, 'secrets') and hasattr(st.secrets, 'openai'):
                     self.api_key = st.secrets.openai.api_key
                 else:
-                    # Fallback to environment variable or placeholder
-                    import os
+                    # Fallback to environment variable (or .env file) or placeholder
+                    _load_dotenv_if_needed()
                     self.api_key = os.environ.get('OPENAI_API_KEY', 'placeholder-key')
             except Exception:
                 # If we can't access Streamlit secrets, try environment variable
-                import os
+                _load_dotenv_if_needed()
                 self.api_key = os.environ.get('OPENAI_API_KEY', 'placeholder-key')
             
             if not self.api_key or self.api_key == 'placeholder-key':
@@ -30,9 +89,17 @@ class LLMEngine:
             # Initialize the LLM model
             self.llm = ChatOpenAI(model="gpt-4o", temperature=0.7, api_key=self.api_key)
 
-            # In-memory store for chat history.
+            self.logger = logging.getLogger(__name__)
+
+            # In-memory store for chat history, bounded to MAX_CHAT_SESSIONS.
             # In a real app, this might be a database or a more persistent store.
-            self.chat_history_store = {}
+            self.chat_history_store = OrderedDict()
+            self._history_lock = threading.Lock()
+
+            # Recent replies to opening questions, keyed by normalized input
+            # and context, with their expiry time; shared across sessions
+            self._response_cache = OrderedDict()
+            self._response_cache_lock = threading.Lock()
 
             # Create the runnable chain with message history
             self.chain = RunnableWithMessageHistory(
@@ -42,24 +109,39 @@ class LLMEngine:
                 history_messages_key="chat_history",
             )
         except Exception as e:
-            raise LLMResponseError(f"Failed to initialize LLMEngine: {e}")
+            raise LLMResponseError(f"Failed to initialize LLMEngine: {e}") from e
 
     def get_session_history(self, session_id: str):
         """
         Retrieves the chat history for a given session ID.
-        If the session ID doesn't exist, it creates a new in-memory history.
+        If the session ID doesn't exist, it creates a new in-memory history,
+        evicting the least recently used session beyond MAX_CHAT_SESSIONS.
         """
-        if session_id not in self.chat_history_store:
-            self.chat_history_store[session_id] = InMemoryChatMessageHistory()
-        return self.chat_history_store[session_id]
+        with self._history_lock:
+            history = self.chat_history_store.get(session_id)
+            if history is None:
+                history = self.chat_history_store[session_id] = BoundedChatMessageHistory()
+                while len(self.chat_history_store) > MAX_CHAT_SESSIONS:
+                    evicted_id, _ = self.chat_history_store.popitem(last=False)
+                    self.logger.info("Evicted chat history for session %.8s", evicted_id)
+            else:
+                self.chat_history_store.move_to_end(session_id)
+            return history
 
-    def generate_response(self, session_id: str, user_input: str) -> str:
+    def clear_session(self, session_id: str):
+        """Drop the stored chat history for a session, if any."""
+        with self._history_lock:
+            self.chat_history_store.pop(session_id, None)
+
+    def generate_response(self, session_id: str, user_input: str,
+                          context_messages: Optional[List[BaseMessage]] = None) -> str:
         """
         Generates a response from the LLM for a given user input and session.
 
         Args:
             session_id: A unique identifier for the user's session.
             user_input: The user's message.
+            context_messages: Optional per-turn context placed after the chat history.
 
         Returns:
             The AI-generated response as a string.
@@ -67,13 +149,174 @@ class LLMEngine:
         if not user_input:
             return "Please provide some input."
 
+        cache_key, cached = self._lookup_cached_response(session_id, user_input, context_messages)
+        if cached is not None:
+            return cached
+
         try:
             # Invoke the chain with the user input and session configuration
             response = self.chain.invoke(
-                {"input": user_input},
+                self._chain_input(user_input, context_messages),
                 config={"configurable": {"session_id": session_id}},
             )
+            self._store_response(cache_key, response.content)
             return response.content
-        except Exception as e:
-            # Catch potential API errors and raise a custom exception
-            raise LLMResponseError(f"Error generating response from LLM: {e}")
\ No newline at end of file
+        except openai.APIError as e:
+            # Catch API errors (connection, rate limit, status) and raise a
+            # custom exception; the client has already retried transient ones
+            raise LLMResponseError(f"Error generating response from LLM: {e}") from e
+
+    def stream_response(self, session_id: str, user_input: str,
+                        context_messages: Optional[List[BaseMessage]] = None) -> Iterator[str]:
+        """
+        Streams a response from the LLM chunk by chunk as it is generated.
+
+        Args:
+            session_id: A unique identifier for the user's session.
+            user_input: The user's message.
+            context_messages: Optional per-turn context placed after the chat history.
+
+        Yields:
+            Pieces of the AI-generated response as strings.
+        """
+        if not user_input:
+            yield "Please provide some input."
+            return
+
+        cache_key, cached = self._lookup_cached_response(session_id, user_input, context_messages)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        try:
+            for chunk in self.chain.stream(
+                self._chain_input(user_input, context_messages),
+                config={"configurable": {"session_id": session_id}},
+            ):
+                if chunk.content:
+                    chunks.append(chunk.content)
+                    yield chunk.content
+        except openai.APIError as e:
+            raise LLMResponseError(f"Error generating response from LLM: {e}") from e
+        self._store_response(cache_key, "".join(chunks))
+
+    async def astream_response(self, session_id: str, user_input: str,
+                               context_messages: Optional[List[BaseMessage]] = None) -> AsyncIterator[str]:
+        """
+        Asynchronously streams a response from the LLM chunk by chunk.
+
+        Lets an async frontend serve several sessions concurrently over the
+        model client's shared connection pool without a thread per request.
+
+        Args:
+            session_id: A unique identifier for the user's session.
+            user_input: The user's message.
+            context_messages: Optional per-turn context placed after the chat history.
+
+        Yields:
+            Pieces of the AI-generated response as strings.
+        """
+        if not user_input:
+            yield "Please provide some input."
+            return
+
+        cache_key, cached = self._lookup_cached_response(session_id, user_input, context_messages)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        try:
+            async for chunk in self.chain.astream(
+                self._chain_input(user_input, context_messages),
+                config={"configurable": {"session_id": session_id}},
+            ):
+                if chunk.content:
+                    chunks.append(chunk.content)
+                    yield chunk.content
+        except openai.APIError as e:
+            raise LLMResponseError(f"Error generating response from LLM: {e}") from e
+        self._store_response(cache_key, "".join(chunks))
+
+    def _chain_input(self, user_input: str,
+                     context_messages: Optional[List[BaseMessage]]) -> dict:
+        """Build the chain input, adding per-turn context only when present."""
+        chain_input = {"input": user_input}
+        if context_messages:
+            chain_input["injected_context"] = context_messages
+        return chain_input
+
+    def _cache_key(self, user_input: str,
+                   context_messages: Optional[List[BaseMessage]] = None) -> bytes:
+        """Build a compact response-cache key for an opening input and its context."""
+        normalized = " ".join(user_input.lower().split()).rstrip(_CACHE_KEY_TRAILING_PUNCTUATION)
+        parts = [normalized]
+        parts.extend(str(message.content) for message in context_messages or ())
+        return hashlib.sha256("\x00".join(parts).encode("utf-8")).digest()[:16]
+
+    def _lookup_cached_response(self, session_id: str, user_input: str,
+                                context_messages: Optional[List[BaseMessage]]) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Look up a cached reply for this turn, recording it in the history on a hit.
+
+        Only a session's opening input is cached: every later reply depends on
+        the conversation so far, which never repeats.
+
+        Returns:
+            The cache key to store a fresh reply under (None if the turn is not
+            cacheable), and the cached reply or None.
+        """
+        with self._history_lock:
+            history = self.chat_history_store.get(session_id)
+            if history is not None and history.messages:
+                return None, None
+        cache_key = self._cache_key(user_input, context_messages)
+        cached = self._get_cached_response(cache_key)
+        if cached is not None:
+            self._record_cached_turn(session_id, user_input, cached)
+        return cache_key, cached
+
+    def _get_cached_response(self, cache_key: bytes) -> Optional[str]:
+        """Return a cached response that has not yet expired, or None."""
+        with self._response_cache_lock:
+            entry = self._response_cache.get(cache_key)
+            if entry is None:
+                return None
+            expires_at, response = entry
+            if expires_at < time.monotonic():
+                del self._response_cache[cache_key]
+                return None
+            self._response_cache.move_to_end(cache_key)
+            return response
+
+    def _store_response(self, cache_key: Optional[bytes], response: str):
+        """Cache a response, evicting the least recently used entries."""
+        if cache_key is None or not response:
+            return
+        with self._response_cache_lock:
+            self._response_cache[cache_key] = (time.monotonic() + RESPONSE_CACHE_TTL, response)
+            self._response_cache.move_to_end(cache_key)
+            while len(self._response_cache) > RESPONSE_CACHE_SIZE:
+                self._response_cache.popitem(last=False)
+
+    def clear_response_cache(self):
+        """Drop every cached response, e.g. after the prompt or model changes."""
+        with self._response_cache_lock:
+            self._response_cache.clear()
+
+    def _record_cached_turn(self, session_id: str, user_input: str, response: str):
+        """Add a turn answered from the cache to the session's chat history."""
+        history = self.get_session_history(session_id)
+        history.add_user_message(user_input)
+        history.add_ai_message(response)
+
+
+@lru_cache(maxsize=1)
+def get_engine() -> LLMEngine:
+    """
+    Returns the process-wide LLMEngine, creating it on first use.
+
+    A failed initialization is not cached, so the next call retries.
+    """
+    return LLMEngine()
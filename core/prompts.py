@@ -1,4 +1,4 @@
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
 # Career Advisor System Prompt
 CAREER_ADVISOR_PROMPT = ChatPromptTemplate.from_messages([
@@ -23,5 +23,10 @@ When appropriate, you can reference:
 - Career transition guidance
 
 Always maintain a professional yet warm tone, and remember that career decisions are deeply personal - respect the user's autonomy while providing informed guidance."""),
+    # The system text above must stay byte-identical between calls and
+    # earlier turns stay as separate messages, so the provider can reuse the
+    # cached prompt prefix. Per-turn context goes after the history instead.
+    MessagesPlaceholder(variable_name="chat_history"),
+    MessagesPlaceholder(variable_name="injected_context", optional=True),
     ("human", "{input}"),
 ])
\ No newline at end of file
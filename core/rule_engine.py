@@ -1,29 +1,43 @@
 #core/rule_engine.py                                                                                                                                                                           
 # Person B (career DB for rule engine)
 
-import json
-import pandas as pd
-from typing import Dict, List, Any, Tuple
+import heapq
+import logging
+import os
+import pickle
+import sys
+import numpy as np
+from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
-from enum import Enum
+from enum import IntEnum
+from functools import lru_cache
+from utils import json_utils
 
-class SkillLevel(Enum):
+class SkillLevel(IntEnum):
     BEGINNER = 1
     INTERMEDIATE = 2
     ADVANCED = 3
     EXPERT = 4
 
-class InterestLevel(Enum):
+class InterestLevel(IntEnum):
     LOW = 1
     MODERATE = 2
     HIGH = 3
     VERY_HIGH = 4
 
+# Level names (e.g. "INTERMEDIATE") to values, avoiding Enum lookups per profile entry
+SKILL_LEVEL_VALUES = {level.name: level.value for level in SkillLevel}
+INTEREST_LEVEL_VALUES = {level.name: level.value for level in InterestLevel}
+
 @dataclass
 class UserProfile:
     """User profile structure for rule matching"""
-    skills: Dict[str, SkillLevel]
-    interests: Dict[str, InterestLevel]
+    # Explicit __slots__ (dataclass(slots=True) needs Python 3.10+)
+    __slots__ = ('skills', 'interests', 'experience_years', 'education_level',
+                 'preferred_work_style', 'salary_expectation', 'location_preference')
+    
+    skills: Dict[str, int]  # SkillLevel values
+    interests: Dict[str, int]  # InterestLevel values
     experience_years: int
     education_level: str
     preferred_work_style: str  # remote, hybrid, onsite
@@ -33,6 +47,10 @@ class UserProfile:
 @dataclass
 class CareerPath:
     """Career path data structure"""
+    __slots__ = ('id', 'title', 'description', 'required_skills', 'relevant_interests',
+                 'min_experience', 'min_education', 'typical_salary_range',
+                 'work_style_compatibility', 'growth_potential', 'job_market_demand')
+    
     id: str
     title: str
     description: str
@@ -45,39 +63,101 @@ class CareerPath:
     growth_potential: int  # 1-10 scale
     job_market_demand: int  # 1-10 scale
 
+# Bump whenever CareerPath's fields or value types change, so pickled
+# career paths written by older code are re-parsed instead of reused
+CAREER_CACHE_VERSION = 1
+
+def _is_cache_current(cache_path: str, source_path: str) -> bool:
+    """Return True if a sidecar cache exists and is not older than its source file"""
+    try:
+        return os.path.getmtime(cache_path) >= os.path.getmtime(source_path)
+    except OSError:
+        # No cached copy yet (or the source itself is missing)
+        return False
+
+# Rules combined into the compatibility score; each has a "<rule>_weight" entry
+SCORING_RULES = ("skill", "interest", "experience", "salary")
+
 class RuleEngine:
     """Core rule-based recommendation engine"""
     
     def __init__(self, career_db_path: str = "data/careers.csv"):
+        self.logger = logging.getLogger(__name__)
         self.career_paths = self._load_career_database(career_db_path)
         self.rules = self._initialize_rules()
+        self._rule_weights = tuple(
+            (rule, self.rules[f"{rule}_weight"]) for rule in SCORING_RULES)
+        self._build_score_arrays()
+        # The general recommendations do not depend on the query, so they are built once
+        self._market_recommendations = None
     
     def _load_career_database(self, db_path: str) -> List[CareerPath]:
-        """Load career database from CSV"""
+        """Load career database, reusing a pickled copy while it is up to date"""
+        cache_path = os.path.splitext(db_path)[0] + '.pkl'
+        if _is_cache_current(cache_path, db_path):
+            try:
+                with open(cache_path, 'rb') as cache_file:
+                    cached = pickle.load(cache_file)
+                if isinstance(cached, tuple) and len(cached) == 2 and cached[0] == CAREER_CACHE_VERSION:
+                    return cached[1]
+                self.logger.info("Ignoring career cache written by an older version")
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+                # Unreadable or truncated cache, or one naming classes that no longer exist
+                self.logger.warning("Ignoring unreadable career cache: %s", e)
+        
+        career_paths = self._parse_career_database(db_path)
+        if career_paths is not None:
+            try:
+                with open(cache_path, 'wb') as cache_file:
+                    pickle.dump((CAREER_CACHE_VERSION, career_paths), cache_file,
+                                protocol=pickle.HIGHEST_PROTOCOL)
+            except OSError:
+                # Caching is best effort (e.g. read-only directory)
+                pass
+            return career_paths
+        return self._get_default_careers()
+    
+    def _parse_career_database(self, db_path: str) -> Optional[List[CareerPath]]:
+        """Parse the career CSV, returning None if it cannot be loaded"""
+        # Imported here: with a current pickle cache, startup never needs pandas
+        import pandas as pd
+        
         try:
             df = pd.read_csv(db_path)
-            career_paths = []
             
-            for _, row in df.iterrows():
-                career = CareerPath(
-                    id=str(row['id']),
-                    title=row['title'],
-                    description=row['description'],
-                    required_skills=json.loads(row['required_skills']),
-                    relevant_interests=json.loads(row['relevant_interests']),
-                    min_experience=int(row['min_experience']),
-                    min_education=row['min_education'],
-                    typical_salary_range=(int(row['salary_min']), int(row['salary_max'])),
-                    work_style_compatibility=json.loads(row['work_style_compatibility']),
-                    growth_potential=int(row['growth_potential']),
-                    job_market_demand=int(row['job_market_demand'])
-                )
-                career_paths.append(career)
+            # Pull whole columns out once instead of materializing a Series per row
+            ints = {column: df[column].astype(int).tolist() for column in (
+                'min_experience', 'salary_min', 'salary_max', 'growth_potential', 'job_market_demand')}
             
-            return career_paths
-        except Exception as e:
-            print(f"Error loading career database: {e}")
-            return self._get_default_careers()
+            return [
+                CareerPath(
+                    id=str(career_id),
+                    title=title,
+                    description=description,
+                    required_skills=json_utils.loads(required_skills),
+                    relevant_interests=json_utils.loads(relevant_interests),
+                    min_experience=min_experience,
+                    min_education=min_education,
+                    typical_salary_range=(salary_min, salary_max),
+                    work_style_compatibility=json_utils.loads(work_styles),
+                    growth_potential=growth_potential,
+                    job_market_demand=job_market_demand
+                )
+                for (career_id, title, description, required_skills, relevant_interests,
+                     min_experience, min_education, salary_min, salary_max, work_styles,
+                     growth_potential, job_market_demand) in zip(
+                    df['id'].tolist(), df['title'].tolist(), df['description'].tolist(),
+                    df['required_skills'].tolist(), df['relevant_interests'].tolist(),
+                    ints['min_experience'], df['min_education'].tolist(),
+                    ints['salary_min'], ints['salary_max'],
+                    df['work_style_compatibility'].tolist(),
+                    ints['growth_potential'], ints['job_market_demand'])
+            ]
+        except (OSError, pd.errors.ParserError, pd.errors.EmptyDataError,
+                KeyError, ValueError, TypeError) as e:
+            # Missing file, malformed CSV, missing column, or a bad JSON/numeric cell
+            self.logger.warning("Career DB load failed, using default careers: %s", e)
+            return None
     
     def _get_default_careers(self) -> List[CareerPath]:
         """Fallback career data if CSV loading fails"""
@@ -110,6 +190,40 @@ class RuleEngine:
             )
         ]
     
+    def _build_score_arrays(self):
+        """
+        Pack career requirements into arrays (one row per career) so a user
+        can be scored against every career in a single vectorized pass.
+        """
+        careers = self.career_paths
+        
+        self._skill_index = {sys.intern(skill): col for col, skill in enumerate(
+            sorted({skill for career in careers for skill in career.required_skills}))}
+        self._interest_index = {sys.intern(interest): col for col, interest in enumerate(
+            sorted({interest for career in careers for interest in career.relevant_interests}))}
+        
+        self._required_skills, self._required_skill_mask = self._requirement_matrix(
+            [career.required_skills for career in careers], self._skill_index)
+        self._relevant_interests, self._relevant_interest_mask = self._requirement_matrix(
+            [career.relevant_interests for career in careers], self._interest_index)
+        self._required_skill_counts = self._required_skill_mask.sum(axis=1)
+        self._relevant_interest_counts = self._relevant_interest_mask.sum(axis=1)
+        
+        self._min_experience = np.array([career.min_experience for career in careers], dtype=float)
+        self._salary_min = np.array([career.typical_salary_range[0] for career in careers], dtype=float)
+        self._salary_max = np.array([career.typical_salary_range[1] for career in careers], dtype=float)
+    
+    @staticmethod
+    def _requirement_matrix(requirements: List[Dict[str, int]], index: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Build a (careers x vocabulary) level matrix and a mask of which entries are required"""
+        levels = np.zeros((len(requirements), len(index)), dtype=np.int16)
+        mask = np.zeros(levels.shape, dtype=bool)
+        for row, required in enumerate(requirements):
+            for name, level in required.items():
+                levels[row, index[name]] = level
+                mask[row, index[name]] = True
+        return levels, mask
+    
     def _initialize_rules(self) -> Dict[str, Any]:
         """Initialize rule weights and thresholds"""
         return {
@@ -126,42 +240,108 @@ class RuleEngine:
         This is a simplified version that provides general recommendations.
         """
         try:
-            # For now, return top careers by market demand and growth potential
-            top_careers = sorted(self.career_paths, 
-                               key=lambda x: (x.job_market_demand, x.growth_potential), 
-                               reverse=True)[:5]
-            
-            response = "Based on current market trends and growth potential, here are some promising career paths:\n\n"
-            
-            for i, career in enumerate(top_careers, 1):
-                response += f"{i}. **{career.title}**\n"
-                response += f"   - {career.description}\n"
-                response += f"   - Salary: ${career.typical_salary_range[0]:,} - ${career.typical_salary_range[1]:,}\n"
-                response += f"   - Growth Potential: {career.growth_potential}/10\n"
-                response += f"   - Market Demand: {career.job_market_demand}/10\n\n"
-            
-            response += "Would you like me to analyze your specific skills and interests to provide more personalized recommendations?"
-            return response
+            if self._market_recommendations is None:
+                self._market_recommendations = self._build_market_recommendations()
+            return self._market_recommendations
             
         except Exception as e:
             return f"I'm having trouble accessing the career database right now. Please try again later. Error: {str(e)}"
     
+    def _build_market_recommendations(self) -> str:
+        """Format the top careers by market demand and growth potential"""
+        top_careers = heapq.nlargest(5, self.career_paths,
+                                     key=lambda x: (x.job_market_demand, x.growth_potential))
+        
+        parts = ["Based on current market trends and growth potential, here are some promising career paths:\n\n"]
+        parts.extend(
+            f"{i}. **{career.title}**\n"
+            f"   - {career.description}\n"
+            f"   - Salary: ${career.typical_salary_range[0]:,} - ${career.typical_salary_range[1]:,}\n"
+            f"   - Growth Potential: {career.growth_potential}/10\n"
+            f"   - Market Demand: {career.job_market_demand}/10\n\n"
+            for i, career in enumerate(top_careers, 1)
+        )
+        parts.append("Would you like me to analyze your specific skills and interests to provide more personalized recommendations?")
+        return "".join(parts)
+    
     def calculate_career_score(self, user: UserProfile, career: CareerPath) -> float:
         """Calculate compatibility score between user and career"""
-        skill_score = self._skill_match_rule(user, career)
-        interest_score = self._interest_alignment_rule(user, career)
-        experience_score = self._experience_requirement_rule(user, career)
-        salary_score = self._salary_expectation_rule(user, career)
+        return self._weighted_score(self._career_score_components(user, career))
+    
+    def _career_score_components(self, user: UserProfile, career: CareerPath) -> Dict[str, float]:
+        """Unweighted score of each rule for one career"""
+        return {
+            "skill": self._skill_match_rule(user, career),
+            "interest": self._interest_alignment_rule(user, career),
+            "experience": self._experience_requirement_rule(user, career),
+            "salary": self._salary_expectation_rule(user, career)
+        }
+    
+    def _weighted_score(self, components: Dict[str, Any]) -> Any:
+        """Weighted combination of rule scores (floats or per-career arrays)"""
+        return sum(components[rule] * weight for rule, weight in self._rule_weights)
+    
+    def calculate_scores(self, user: UserProfile) -> np.ndarray:
+        """
+        Calculate compatibility scores between a user and every loaded career.
         
-        # Weighted combination
-        total_score = (
-            skill_score * self.rules["skill_weight"] +
-            interest_score * self.rules["interest_weight"] +
-            experience_score * self.rules["experience_weight"] +
-            salary_score * self.rules["salary_weight"]
-        )
+        Applies the same rules and weights as calculate_career_score, but over
+        the packed career arrays instead of one career at a time.
+        
+        Returns:
+            Array of scores aligned with self.career_paths
+        """
+        return self._weighted_score(self._score_components(user))
+    
+    def _score_components(self, user: UserProfile) -> Dict[str, np.ndarray]:
+        """Unweighted score of each rule for every loaded career"""
+        skill_scores = self._tiered_match_scores(
+            user.skills, self._skill_index, self._required_skills,
+            self._required_skill_mask, self._required_skill_counts,
+            SkillLevel.BEGINNER.value, 0.7, 0.3)
+        interest_scores = self._tiered_match_scores(
+            user.interests, self._interest_index, self._relevant_interests,
+            self._relevant_interest_mask, self._relevant_interest_counts,
+            InterestLevel.MODERATE.value, 0.8, 0.4)
         
-        return total_score
+        experience = user.experience_years
+        experience_scores = np.select(
+            [experience >= self._min_experience,
+             experience >= self._min_experience * 0.7,
+             experience >= self._min_experience * 0.5],
+            [1.0, 0.8, 0.6], default=0.3)
+        
+        salary = user.salary_expectation
+        salary_scores = np.select(
+            [(salary <= self._salary_max) & (salary >= self._salary_min),
+             salary <= self._salary_max * 1.2,
+             salary <= self._salary_max * 1.5],
+            [1.0, 0.8, 0.6], default=0.4)
+        
+        return {
+            "skill": skill_scores,
+            "interest": interest_scores,
+            "experience": experience_scores,
+            "salary": salary_scores
+        }
+    
+    def _tiered_match_scores(self, user_levels: Dict[str, Any], index: Dict[str, int],
+                             required: np.ndarray, mask: np.ndarray, counts: np.ndarray,
+                             default_level: int, near_score: float, far_score: float) -> np.ndarray:
+        """Vectorized form of the skill/interest rules for every career at once"""
+        if not user_levels:
+            return np.full(len(required), 0.5)  # Neutral score if nothing specified
+        
+        user_vector = np.full(len(index), default_level, dtype=np.int16)
+        for name, level in user_levels.items():
+            col = index.get(name)
+            if col is not None:
+                user_vector[col] = level
+        
+        gap = user_vector - required
+        tiers = np.where(gap >= 0, 1.0, np.where(gap >= -1, near_score, far_score))
+        totals = np.where(mask, tiers, 0.0).sum(axis=1)
+        return np.divide(totals, counts, out=np.zeros(len(required)), where=counts > 0)
     
     def _skill_match_rule(self, user: UserProfile, career: CareerPath) -> float:
         """Calculate skill match score"""
@@ -173,9 +353,9 @@ class RuleEngine:
         
         for skill, required_level in career.required_skills.items():
             user_level = user.skills.get(skill, SkillLevel.BEGINNER)
-            if user_level.value >= required_level:
+            if user_level >= required_level:
                 total_score += 1.0
-            elif user_level.value >= required_level - 1:
+            elif user_level >= required_level - 1:
                 total_score += 0.7
             else:
                 total_score += 0.3
@@ -192,9 +372,9 @@ class RuleEngine:
         
         for interest, required_level in career.relevant_interests.items():
             user_level = user.interests.get(interest, InterestLevel.MODERATE)
-            if user_level.value >= required_level:
+            if user_level >= required_level:
                 total_score += 1.0
-            elif user_level.value >= required_level - 1:
+            elif user_level >= required_level - 1:
                 total_score += 0.8
             else:
                 total_score += 0.4
@@ -228,20 +408,36 @@ class RuleEngine:
     
     def get_top_recommendations(self, user: UserProfile, top_n: int = 5) -> List[Tuple[CareerPath, float, Dict[str, str]]]:
         """Get top career recommendations with explanations"""
-        scored_careers = []
+        components = self._score_components(user)
+        scores = self._weighted_score(components)
         
-        for career in self.career_paths:
-            score = self.calculate_career_score(user, career)
-            explanation = self._generate_explanation(user, career, score)
-            scored_careers.append((career, score, explanation))
+        # Stable sort by score descending so ties keep database order (rounding
+        # absorbs float noise between equal scores); explanations are only
+        # generated for the careers returned
+        top_indices = np.argsort(-np.round(scores, 9), kind="stable")[:max(top_n, 0)]
         
-        # Sort by score descending
-        scored_careers.sort(key=lambda x: x[1], reverse=True)
+        recommendations = []
+        for index in top_indices:
+            career = self.career_paths[index]
+            score = float(scores[index])
+            career_components = {rule: float(values[index]) for rule, values in components.items()}
+            explanation = self._generate_explanation(user, career, score, career_components)
+            recommendations.append((career, score, explanation))
         
-        return scored_careers[:top_n]
+        return recommendations
     
-    def _generate_explanation(self, user: UserProfile, career: CareerPath, score: float) -> Dict[str, str]:
-        """Generate explanation for the recommendation"""
+    def _generate_explanation(self, user: UserProfile, career: CareerPath, score: float,
+                              components: Optional[Dict[str, float]] = None) -> Dict[str, str]:
+        """
+        Generate explanation for the recommendation.
+        
+        Args:
+            components: Rule scores already computed for this career; the
+                rules are only re-run when they are not supplied
+        """
+        if components is None:
+            components = self._career_score_components(user, career)
+        
         explanations = {
             "overall": f"Overall compatibility: {score:.1%}",
             "strengths": [],
@@ -249,14 +445,14 @@ class RuleEngine:
         }
         
         # Skill analysis
-        skill_score = self._skill_match_rule(user, career) / 0.4  # Normalize
+        skill_score = components["skill"] / 0.4  # Normalize
         if skill_score > 0.8:
             explanations["strengths"].append("Strong skill alignment")
         elif skill_score < 0.5:
             explanations["considerations"].append("May need to develop additional skills")
         
         # Interest analysis
-        interest_score = self._interest_alignment_rule(user, career) / 0.25
+        interest_score = components["interest"] / 0.25
         if interest_score > 0.8:
             explanations["strengths"].append("Excellent interest match")
         elif interest_score < 0.5:
@@ -274,24 +470,33 @@ class RuleEngine:
         
         return explanations
 
+@lru_cache(maxsize=None)
+def get_engine(career_db_path: str = "data/careers.csv") -> RuleEngine:
+    """
+    Return a shared RuleEngine for the given career database, loading it on
+    first use. The loaded careers are read-only, so one instance can serve
+    every session and thread.
+    """
+    return RuleEngine(career_db_path)
+
 # Usage example and helper functions
 def create_user_profile_from_dict(data: dict) -> UserProfile:
     """Helper to create UserProfile from dictionary data"""
-    # Convert string skill levels to enums
+    # Store levels as plain ints (they compare equal to the enum members) and
+    # intern the names so lookups against career requirements hit by identity
     skills = {}
     for skill, level in data.get('skills', {}).items():
         if isinstance(level, str):
-            skills[skill] = SkillLevel[level.upper()]
+            skills[sys.intern(skill)] = SKILL_LEVEL_VALUES[level.upper()]
         else:
-            skills[skill] = SkillLevel(level)
+            skills[sys.intern(skill)] = SkillLevel(level).value
     
-    # Convert string interest levels to enums
     interests = {}
     for interest, level in data.get('interests', {}).items():
         if isinstance(level, str):
-            interests[interest] = InterestLevel[level.upper()]
+            interests[sys.intern(interest)] = INTEREST_LEVEL_VALUES[level.upper()]
         else:
-            interests[interest] = InterestLevel(level)
+            interests[sys.intern(interest)] = InterestLevel(level).value
     
     return UserProfile(
         skills=skills,
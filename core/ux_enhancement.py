@@ -1,7 +1,20 @@
 # core/ux_enhancements.py
-import json
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List, Dict, Any
+from utils import json_utils
+
+# Follow-up suggestions, built once at import
+DEFAULT_SUGGESTIONS = (
+    "Tell me more about the first option.",
+    "What skills are needed for that?",
+    "How does that compare to my current role?",
+    "Can you explain that in simpler terms?"
+)
+GREETING_SUGGESTIONS = (
+    "What career field are you interested in?",
+    "Help me improve my resume.",
+    "I want to change careers."
+)
 
 def get_follow_up_suggestions(last_bot_message: str) -> List[str]:
     """
@@ -10,42 +23,42 @@ def get_follow_up_suggestions(last_bot_message: str) -> List[str]:
     This is a simple placeholder. A more advanced version could use another
     LLM call or NLP to generate more relevant questions.
     """
-    suggestions = [
-        "Tell me more about the first option.",
-        "What skills are needed for that?",
-        "How does that compare to my current role?",
-        "Can you explain that in simpler terms?"
-    ]
-    
     # Simple logic to avoid showing irrelevant follow-ups
-    if "welcome" in last_bot_message.lower() or "hello" in last_bot_message.lower():
-        return [
-            "What career field are you interested in?",
-            "Help me improve my resume.",
-            "I want to change careers."
-        ]
+    message = last_bot_message.lower()
+    if "welcome" in message or "hello" in message:
+        return list(GREETING_SUGGESTIONS)
         
-    return suggestions
+    return list(DEFAULT_SUGGESTIONS)
 
-def format_chat_history_for_export(messages: List[Dict[str, Any]]) -> str:
+def format_chat_history_for_export(messages: List[Dict[str, Any]], include_transcript: bool = True) -> str:
     """
     Formats the entire chat history into a human-readable string and then JSON.
-    """
     
-    # Create a human-readable header
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    header = f"CareerBot Conversation Export\nTimestamp: {timestamp}\n"
+    Args:
+        messages: Chat messages with 'role' and 'content'
+        include_transcript: Also embed the readable transcript; pass False for
+            long chats when only the raw messages are needed, so every message
+            body is not held and encoded twice
+    """
     
-    # Format the conversation
-    conversation_text = "\n\n".join(
-        [f"{msg['role'].capitalize()}:\n{msg['content']}" for msg in messages]
-    )
+    # Read the clock once: local time for the header, naive UTC for the data
+    now = datetime.now(timezone.utc)
     
     export_data = {
-        "export_timestamp_utc": datetime.utcnow().isoformat(),
+        "export_timestamp_utc": now.replace(tzinfo=None).isoformat(),
         "total_messages": len(messages),
-        "conversation": messages,
-        "readable_transcript": f"{header}\n---\n\n{conversation_text}"
+        "conversation": messages
     }
     
-    return json.dumps(export_data, indent=2)
\ No newline at end of file
+    if include_transcript:
+        # Create a human-readable header
+        timestamp = now.astimezone().strftime("%Y-%m-%d %H:%M:%S")
+        header = f"CareerBot Conversation Export\nTimestamp: {timestamp}\n"
+        
+        # Format the conversation
+        conversation_text = "\n\n".join(
+            f"{msg['role'].capitalize()}:\n{msg['content']}" for msg in messages
+        )
+        export_data["readable_transcript"] = f"{header}\n---\n\n{conversation_text}"
+    
+    return json_utils.dumps(export_data, indent=True).decode('utf-8')
@@ -7,6 +7,38 @@ import os
 import sys
 import subprocess
 import importlib.util
+from importlib import metadata
+
+# Written after all checks pass; later runs skip the checks while it is current
+SETUP_MARKER = ".streamlit/.setup_ok"
+
+# Changes to any of these files invalidate the marker
+SETUP_INPUTS = [
+    "requirements.txt",
+    "streamlit/secrets.toml",
+    ".streamlit/config.toml"
+]
+
+def is_setup_current():
+    """Check if a previous run passed all checks with the same interpreter and inputs"""
+    try:
+        with open(SETUP_MARKER) as marker:
+            if marker.read() != sys.executable:
+                return False
+        marker_time = os.path.getmtime(SETUP_MARKER)
+        return all(os.path.getmtime(path) < marker_time for path in SETUP_INPUTS)
+    except OSError:
+        return False
+
+def mark_setup_current():
+    """Record that all checks passed for this interpreter"""
+    try:
+        os.makedirs(os.path.dirname(SETUP_MARKER), exist_ok=True)
+        with open(SETUP_MARKER, "w") as marker:
+            marker.write(sys.executable)
+    except OSError:
+        # The marker only saves time on the next start
+        pass
 
 def check_python_version():
     """Check if Python version is compatible"""
@@ -16,6 +48,15 @@ def check_python_version():
     print(f"✅ Python version: {sys.version.split()[0]}")
     return True
 
+def is_package_installed(package):
+    """Check if a package is installed without importing it"""
+    try:
+        metadata.version(package)
+        return True
+    except metadata.PackageNotFoundError:
+        # Not installed as a distribution, but it may still be importable
+        return importlib.util.find_spec(package) is not None
+
 def check_dependencies():
     """Check if required dependencies are installed"""
     required_packages = [
@@ -26,17 +67,20 @@ def check_dependencies():
     
     missing_packages = []
     for package in required_packages:
-        try:
-            importlib.import_module(package)
+        # Reading package metadata avoids importing streamlit and pandas just to check them
+        if is_package_installed(package):
             print(f"✅ {package} is installed")
-        except ImportError:
+        else:
             print(f"❌ {package} is missing")
             missing_packages.append(package)
     
     if missing_packages:
         print(f"\n📦 Installing missing packages: {', '.join(missing_packages)}")
         try:
-            subprocess.check_call([sys.executable, "-m", "pip", "install"] + missing_packages)
+            subprocess.check_call([
+                sys.executable, "-m", "pip", "install",
+                "--disable-pip-version-check", "--no-input", "-q"
+            ] + missing_packages)
             print("✅ Dependencies installed successfully")
         except subprocess.CalledProcessError:
             print("❌ Failed to install dependencies")
@@ -89,6 +133,11 @@ def main():
     print("🎯 Career Guidance Chatbot Setup")
     print("=" * 40)
     
+    if is_setup_current():
+        print("✅ Setup unchanged since the last successful check")
+        start_application()
+        return
+    
     # Run checks
     checks = [
         check_python_version,
@@ -104,6 +153,7 @@ def main():
     
     if all_passed:
         print("✅ All checks passed!")
+        mark_setup_current()
         start_application()
     else:
         print("⚠️  Some checks failed. Please resolve the issues above.")
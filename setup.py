@@ -7,6 +7,8 @@ import os
 import sys
 import subprocess
 import shutil
+import io
+from contextlib import redirect_stdout
 
 def install_requirements():
     """Install required packages from requirements.txt"""
@@ -14,7 +16,9 @@ def install_requirements():
     
     try:
         subprocess.check_call([
-            sys.executable, "-m", "pip", "install", "-r", "requirements.txt"
+            sys.executable, "-m", "pip", "install",
+            "--disable-pip-version-check", "--no-input", "-q",
+            "-r", "requirements.txt"
         ])
         print("✅ Requirements installed successfully")
         return True
@@ -35,6 +39,8 @@ def create_directories():
     for directory in directories:
         os.makedirs(directory, exist_ok=True)
         print(f"✅ Created directory: {directory}")
+    
+    return True
 
 def setup_secrets():
     """Set up secrets file if it doesn't exist"""
@@ -72,17 +78,19 @@ def run_tests():
     print("🧪 Running basic tests...")
     
     try:
-        result = subprocess.run([
-            sys.executable, "test_setup.py"
-        ], capture_output=True, text=True)
+        # Run the checks in this interpreter instead of starting a new one
+        from test_setup import main as run_test_suite
+        
+        output = io.StringIO()
+        with redirect_stdout(output):
+            passed = run_test_suite()
         
-        if result.returncode == 0:
+        if passed:
             print("✅ Basic tests passed")
             return True
         else:
             print("❌ Basic tests failed")
-            print(result.stdout)
-            print(result.stderr)
+            print(output.getvalue())
             return False
     except Exception as e:
         print(f"❌ Failed to run tests: {e}")
@@ -0,0 +1,82 @@
+# tests/test_formatter.py
+# Tests for message and export formatting helpers
+
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.formatter import format_message, format_message_content, sanitize_filename
+
+class TestFormatMessageContent(unittest.TestCase):
+
+    def test_plain_text_unchanged(self):
+        """Test plain text passes through untouched"""
+        self.assertEqual(format_message_content("Hello there"), "Hello there")
+
+    def test_markdown_rendering(self):
+        """Test bold, italic and inline code are converted to HTML"""
+        formatted = format_message_content("**Bold** and *italic* with `code`")
+
+        self.assertIn("<strong>Bold</strong>", formatted)
+        self.assertIn("<em>italic</em>", formatted)
+        self.assertIn("<code>code</code>", formatted)
+
+    def test_code_spans_are_literal(self):
+        """Test asterisks inside inline code are not treated as emphasis"""
+        formatted = format_message_content("Run `a*b` then *check*")
+
+        self.assertEqual(formatted, "Run <code>a*b</code> then <em>check</em>")
+
+    def test_line_breaks(self):
+        """Test newlines become HTML line breaks"""
+        self.assertEqual(format_message_content("one\ntwo"), "one<br>two")
+
+    def test_html_is_escaped(self):
+        """Test raw HTML in user content is escaped"""
+        formatted = format_message_content("<script>alert('x')</script>")
+
+        self.assertNotIn("<script>", formatted)
+        self.assertIn("&lt;script&gt;", formatted)
+
+    def test_block_markdown(self):
+        """Test headings, bullet lists and numbered lists become HTML blocks"""
+        formatted = format_message_content("### Options\n\n- **Data** analyst\n- Engineer\n\n1. Learn\n2. Apply")
+
+        self.assertEqual(formatted, (
+            "<h3>Options</h3>"
+            "<ul><li><strong>Data</strong> analyst</li><li>Engineer</li></ul>"
+            "<ol><li>Learn</li><li>Apply</li></ol>"
+        ))
+
+    def test_links_rendered_for_web_urls_only(self):
+        """Test http(s) links become anchors while other schemes stay literal"""
+        formatted = format_message_content("See [guide](https://example.com/a?b=1&c=2)")
+
+        self.assertIn('<a href="https://example.com/a?b=1&amp;c=2"', formatted)
+        self.assertEqual(format_message_content("[x](javascript:alert(1))"), "[x](javascript:alert(1))")
+
+class TestFormatMessage(unittest.TestCase):
+
+    def test_message_structure(self):
+        """Test message dictionary contains role, content and timestamp"""
+        message = format_message("user", "Hi", "2025-08-30 10:00:00")
+
+        self.assertEqual(message, {
+            "role": "user",
+            "content": "Hi",
+            "timestamp": "2025-08-30 10:00:00"
+        })
+
+class TestSanitizeFilename(unittest.TestCase):
+
+    def test_invalid_characters_replaced(self):
+        """Test characters not allowed in file names become underscores"""
+        self.assertEqual(sanitize_filename('chat<1>:"a/b\\c|d?*.json'), 'chat_1___a_b_c_d__.json')
+
+    def test_length_limited(self):
+        """Test long names are truncated to 100 characters"""
+        self.assertEqual(len(sanitize_filename("a" * 150)), 100)
+
+if __name__ == '__main__':
+    unittest.main()
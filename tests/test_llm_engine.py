@@ -1,6 +1,11 @@
+import asyncio
+import httpx
+import openai
 import pytest
 from unittest.mock import patch, MagicMock
+from langchain_core.language_models import FakeListChatModel
 
+from langchain_core.messages import HumanMessage
 from core.llm_engine import LLMEngine
 from utils.errors import LLMResponseError
 
@@ -63,7 +68,191 @@ def test_generate_response_api_failure(mock_chat_openai):
     with patch.dict('os.environ', {'OPENAI_API_KEY': 'test_key'}):
         engine = LLMEngine()
         engine.chain = MagicMock()
-        engine.chain.invoke.side_effect = Exception("API connection timed out")
+        engine.chain.invoke.side_effect = openai.APIConnectionError(
+            message="API connection timed out", request=httpx.Request("POST", "https://api.openai.com")
+        )
 
         with pytest.raises(LLMResponseError, match="Error generating response from LLM"):
-            engine.generate_response("session_456", "A question that will fail.")
\ No newline at end of file
+            engine.generate_response("session_456", "A question that will fail.")
+
+@patch('core.llm_engine.ChatOpenAI')
+def test_opening_question_cached_across_sessions(mock_chat_openai):
+    """
+    Tests that a session's opening question is answered from the cache in later sessions.
+    """
+    mock_chat_openai.return_value = FakeListChatModel(responses=["Advice 1", "Advice 2"])
+    with patch.dict('os.environ', {'OPENAI_API_KEY': 'test_key'}):
+        engine = LLMEngine()
+
+        first = engine.generate_response("session_789", "What career suits my skills?")
+        second = engine.generate_response("session_790", "  what career suits my skills ")
+
+        assert first == second == "Advice 1"
+        # The cached turn is still recorded in the second session's history
+        assert [m.content for m in engine.get_session_history("session_790").messages] == [
+            "  what career suits my skills ", "Advice 1"
+        ]
+
+@patch('core.llm_engine.ChatOpenAI')
+def test_follow_up_questions_not_cached(mock_chat_openai):
+    """
+    Tests that inputs after the first turn always reach the model.
+    """
+    mock_chat_openai.return_value = FakeListChatModel(responses=["A1", "A2", "A3", "A4"])
+    with patch.dict('os.environ', {'OPENAI_API_KEY': 'test_key'}):
+        engine = LLMEngine()
+
+        replies = [engine.generate_response("session_791", text)
+                   for text in ("Tell me more", "Tell me more", "hi", "hi")]
+
+        assert replies == ["A1", "A2", "A3", "A4"]
+        assert len(engine.get_session_history("session_791").messages) == 8
+
+@patch('core.llm_engine.ChatOpenAI')
+def test_clear_response_cache(mock_chat_openai):
+    """
+    Tests that clearing the response cache makes the next call hit the LLM again.
+    """
+    mock_chat_openai.return_value = FakeListChatModel(responses=["Advice 1", "Advice 2"])
+    with patch.dict('os.environ', {'OPENAI_API_KEY': 'test_key'}):
+        engine = LLMEngine()
+
+        engine.generate_response("session_792", "How do I change careers?")
+        engine.clear_response_cache()
+
+        assert engine.generate_response("session_793", "How do I change careers?") == "Advice 2"
+
+@patch('core.llm_engine.ChatOpenAI')
+def test_stream_response_yields_chunks(mock_chat_openai):
+    """
+    Tests that streamed chunks are yielded in order and empty chunks are skipped.
+    """
+    with patch.dict('os.environ', {'OPENAI_API_KEY': 'test_key'}):
+        engine = LLMEngine()
+        engine.chain = MagicMock()
+        engine.chain.stream.return_value = iter(
+            [MockAIMessage("Career "), MockAIMessage(""), MockAIMessage("advice.")]
+        )
+
+        chunks = list(engine.stream_response("session_321", "Any advice?"))
+
+        assert chunks == ["Career ", "advice."]
+
+@patch('core.llm_engine.ChatOpenAI')
+def test_astream_response_yields_chunks_and_caches(mock_chat_openai):
+    """
+    Tests that async streaming yields the reply and serves a later opening question from the cache.
+    """
+    async def collect(session_id, user_input):
+        return [chunk async for chunk in engine.astream_response(session_id, user_input)]
+
+    mock_chat_openai.return_value = FakeListChatModel(responses=["Career advice.", "Other advice."])
+    with patch.dict('os.environ', {'OPENAI_API_KEY': 'test_key'}):
+        engine = LLMEngine()
+
+        assert "".join(asyncio.run(collect("session_322", "Any advice?"))) == "Career advice."
+        assert asyncio.run(collect("session_323", "Any advice?")) == ["Career advice."]
+        assert len(engine.get_session_history("session_322").messages) == 2
+
+@patch('core.llm_engine.MAX_CHAT_SESSIONS', 2)
+@patch('core.llm_engine.ChatOpenAI')
+def test_chat_history_store_evicts_least_recent(mock_chat_openai):
+    """
+    Tests that the least recently used session history is evicted when the store is full.
+    """
+    with patch.dict('os.environ', {'OPENAI_API_KEY': 'test_key'}):
+        engine = LLMEngine()
+        engine.get_session_history("first")
+        engine.get_session_history("second")
+        engine.get_session_history("first")
+        engine.get_session_history("third")
+
+        assert list(engine.chat_history_store) == ["first", "third"]
+
+@patch('core.llm_engine.ChatOpenAI')
+def test_clear_session_drops_history(mock_chat_openai):
+    """
+    Tests that clearing a session removes only that session's history.
+    """
+    with patch.dict('os.environ', {'OPENAI_API_KEY': 'test_key'}):
+        engine = LLMEngine()
+        engine.get_session_history("kept").add_user_message("Hi")
+        engine.get_session_history("cleared").add_user_message("Hi")
+
+        engine.clear_session("cleared")
+        engine.clear_session("unknown")
+
+        assert list(engine.chat_history_store) == ["kept"]
+
+@patch('core.llm_engine.ChatOpenAI')
+@patch('core.llm_engine.MAX_HISTORY_MESSAGES', 4)
+def test_session_history_keeps_recent_messages(mock_chat_openai):
+    """
+    Tests that a session's history only keeps the most recent messages.
+    """
+    with patch.dict('os.environ', {'OPENAI_API_KEY': 'test_key'}):
+        engine = LLMEngine()
+        history = engine.get_session_history("session_long")
+        for turn in range(3):
+            history.add_user_message(f"Question {turn}")
+            history.add_ai_message(f"Answer {turn}")
+
+        assert [m.content for m in history.messages] == [
+            "Question 1", "Answer 1", "Question 2", "Answer 2"
+        ]
+
+@patch('core.llm_engine.ChatOpenAI')
+@patch('core.llm_engine.MAX_HISTORY_MESSAGES', 8)
+def test_session_history_trimmed_in_blocks(mock_chat_openai):
+    """
+    Tests that trimming keeps the history prefix unchanged until the next trim.
+    """
+    with patch.dict('os.environ', {'OPENAI_API_KEY': 'test_key'}):
+        engine = LLMEngine()
+        history = engine.get_session_history("session_blocks")
+        prefixes = []
+        for turn in range(8):
+            history.add_user_message(f"Question {turn}")
+            history.add_ai_message(f"Answer {turn}")
+            prefixes.append(history.messages[0].content)
+
+        # Trimmed at turns 4 and 6, back to whole turns starting with a question
+        assert prefixes == ["Question 0"] * 4 + ["Question 2"] * 2 + ["Question 4"] * 2
+        assert len(history.messages) <= 8
+
+@patch('core.llm_engine.ChatOpenAI')
+def test_cache_key_ignores_punctuation_and_spacing(mock_chat_openai):
+    """
+    Tests that near-identical inputs share a response-cache key.
+    """
+    with patch.dict('os.environ', {'OPENAI_API_KEY': 'test_key'}):
+        engine = LLMEngine()
+
+        key = engine._cache_key("How do I write a resume?")
+        assert engine._cache_key("how do  I write a resume") == key
+        assert engine._cache_key("How do I write a resume?", [HumanMessage("Profile: analyst")]) != key
+
+@patch('core.llm_engine.ChatOpenAI')
+def test_cache_key_keeps_inner_punctuation(mock_chat_openai):
+    """
+    Tests that inputs differing only in inner punctuation get different cache keys.
+    """
+    with patch.dict('os.environ', {'OPENAI_API_KEY': 'test_key'}):
+        engine = LLMEngine()
+
+        assert engine._cache_key("What is C++?") != engine._cache_key("What is C?")
+        assert engine._cache_key("Is 5.5 ok") != engine._cache_key("Is 55 ok")
+        assert engine._cache_key("Node.js") != engine._cache_key("Nodejs")
+
+@patch('core.llm_engine.ChatOpenAI')
+def test_generate_response_unexpected_error_propagates(mock_chat_openai):
+    """
+    Tests that non-API errors are not disguised as LLMResponseError.
+    """
+    with patch.dict('os.environ', {'OPENAI_API_KEY': 'test_key'}):
+        engine = LLMEngine()
+        engine.chain = MagicMock()
+        engine.chain.invoke.side_effect = KeyError("chat_history")
+
+        with pytest.raises(KeyError):
+            engine.generate_response("session_654", "A question that hits a bug.")
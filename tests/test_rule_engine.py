@@ -13,12 +13,13 @@ from core.rule_engine import (
 
 class TestRuleEngine(unittest.TestCase):
     
-    def setUp(self):
-        """Set up test fixtures"""
-        self.rule_engine = RuleEngine()
+    @classmethod
+    def setUpClass(cls):
+        """Set up shared test fixtures (none of the tests mutate them)"""
+        cls.rule_engine = RuleEngine()
         
         # Create test user profile
-        self.test_user = UserProfile(
+        cls.test_user = UserProfile(
             skills={
                 "programming": SkillLevel.INTERMEDIATE,
                 "problem_solving": SkillLevel.ADVANCED,
@@ -37,7 +38,7 @@ class TestRuleEngine(unittest.TestCase):
         )
         
         # Create test career path
-        self.test_career = CareerPath(
+        cls.test_career = CareerPath(
             id="test_software_engineer",
             title="Software Engineer",
             description="Test software engineer role",
@@ -149,8 +150,9 @@ class TestRuleEngine(unittest.TestCase):
 
 class TestRuleEngineEdgeCases(unittest.TestCase):
     
-    def setUp(self):
-        self.rule_engine = RuleEngine()
+    @classmethod
+    def setUpClass(cls):
+        cls.rule_engine = RuleEngine()
     
     def test_user_lacks_required_skills(self):
         """Test scoring when user lacks required skills"""
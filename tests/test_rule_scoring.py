@@ -0,0 +1,90 @@
+# tests/test_rule_scoring.py
+# Tests for vectorized career scoring in the rule engine
+
+import unittest
+import sys
+import os
+import pickle
+import shutil
+import tempfile
+from unittest.mock import patch
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.rule_engine import RuleEngine, CAREER_CACHE_VERSION, create_user_profile_from_dict
+
+CAREERS_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'careers.csv')
+
+class TestVectorizedScoring(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.rule_engine = RuleEngine()
+
+    def setUp(self):
+        self.user = create_user_profile_from_dict({
+            'skills': {'programming': 'advanced', 'statistics': 'intermediate', 'cooking': 'expert'},
+            'interests': {'technology': 'very_high', 'analytics': 'low'},
+            'experience_years': 3,
+            'salary_expectation': 90000
+        })
+
+    def test_scores_match_per_career_calculation(self):
+        """Test vectorized scores equal the per-career rule calculation"""
+        scores = self.rule_engine.calculate_scores(self.user)
+
+        self.assertEqual(len(scores), len(self.rule_engine.career_paths))
+        for career, score in zip(self.rule_engine.career_paths, scores):
+            self.assertAlmostEqual(score, self.rule_engine.calculate_career_score(self.user, career))
+
+    def test_empty_profile_uses_neutral_scores(self):
+        """Test a profile without skills or interests still scores every career"""
+        user = create_user_profile_from_dict({})
+        scores = self.rule_engine.calculate_scores(user)
+
+        for career, score in zip(self.rule_engine.career_paths, scores):
+            self.assertAlmostEqual(score, self.rule_engine.calculate_career_score(user, career))
+
+    def test_top_recommendations_sorted(self):
+        """Test top recommendations are the highest scores in descending order"""
+        recommendations = self.rule_engine.get_top_recommendations(self.user, top_n=5)
+        scores = [score for _, score, _ in recommendations]
+
+        self.assertEqual(len(recommendations), 5)
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertAlmostEqual(scores[0], max(self.rule_engine.calculate_scores(self.user)))
+        for _, _, explanation in recommendations:
+            self.assertIn('overall', explanation)
+
+class TestCareerCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.csv_path = os.path.join(self.temp_dir, 'careers.csv')
+        self.cache_path = os.path.join(self.temp_dir, 'careers.pkl')
+        shutil.copy(CAREERS_CSV, self.csv_path)
+
+    def test_outdated_cache_is_reparsed(self):
+        """Test a cache from an older format is ignored and rewritten"""
+        with open(self.cache_path, 'wb') as cache_file:
+            pickle.dump(['stale career'], cache_file)
+
+        careers = RuleEngine(self.csv_path).career_paths
+
+        self.assertEqual([career.id for career in careers],
+                         [career.id for career in RuleEngine(CAREERS_CSV).career_paths])
+        with open(self.cache_path, 'rb') as cache_file:
+            self.assertEqual(pickle.load(cache_file)[0], CAREER_CACHE_VERSION)
+
+    def test_current_cache_is_reused(self):
+        """Test a cache written by this version is loaded instead of the CSV"""
+        first = RuleEngine(self.csv_path).career_paths
+
+        with patch.object(RuleEngine, '_parse_career_database') as parse:
+            cached = RuleEngine(self.csv_path).career_paths
+
+        parse.assert_not_called()
+        self.assertEqual([career.id for career in cached], [career.id for career in first])
+
+if __name__ == '__main__':
+    unittest.main()
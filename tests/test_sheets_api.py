@@ -0,0 +1,289 @@
+# tests/test_sheets_api.py
+# Tests for Google Sheets persistence (worksheets are mocked)
+
+import unittest
+import base64
+import sys
+import os
+import threading
+import time
+from unittest.mock import Mock, patch
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.sheets_api import SheetsAPI, CELL_CHARACTER_LIMIT, decode_export_cell
+from utils.errors import SheetsAPIError
+
+class TestSheetsAPIWriter(unittest.TestCase):
+
+    def setUp(self):
+        """Create an offline SheetsAPI wired to a mocked worksheet"""
+        with patch('utils.sheets_api.GSPREAD_AVAILABLE', False):
+            self.sheets_api = SheetsAPI()
+        self.worksheet = Mock()
+        self.sheets_api.client = Mock()
+        self.sheets_api.worksheets = {'chat_messages': self.worksheet}
+
+    def _message(self, index):
+        return {
+            'session_id': 'test_session',
+            'timestamp': f'2025-08-30T10:00:0{index}',
+            'role': 'user',
+            'content': f'Message {index}',
+            'metadata': ''
+        }
+
+    def test_append_messages_single_request(self):
+        """Test multiple messages are written with one append_rows call"""
+        self.sheets_api.append_messages([self._message(1), self._message(2)])
+
+        self.worksheet.append_rows.assert_called_once()
+        rows = self.worksheet.append_rows.call_args[0][0]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0], ['test_session', '2025-08-30T10:00:01', 'user', 'Message 1', ''])
+
+    def test_enqueued_messages_written_on_flush(self):
+        """Test queued messages are persisted by the background writer"""
+        for index in range(3):
+            self.sheets_api.enqueue_message(self._message(index))
+        self.sheets_api.flush()
+
+        written = [row for call in self.worksheet.append_rows.call_args_list for row in call[0][0]]
+        self.assertEqual([row[3] for row in written], ['Message 0', 'Message 1', 'Message 2'])
+
+    def test_concurrent_enqueues_start_one_writer(self):
+        """Test sessions enqueueing at the same time share a single writer thread"""
+        barrier = threading.Barrier(8)
+
+        def enqueue(index):
+            barrier.wait()
+            self.sheets_api.enqueue_message(self._message(index))
+
+        def slow_thread(*args, **kwargs):
+            # Widen the window between the "no writer yet" check and the start
+            time.sleep(0.05)
+            return real_thread(*args, **kwargs)
+
+        real_thread = threading.Thread
+        threads = [threading.Thread(target=enqueue, args=(index,)) for index in range(8)]
+        with patch('utils.sheets_api.atexit.register') as register, \
+             patch('utils.sheets_api.threading.Thread', side_effect=slow_thread) as thread_class:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.sheets_api.flush()
+
+        thread_class.assert_called_once()
+        register.assert_called_once()
+        written = sum(len(call[0][0]) for call in self.worksheet.append_rows.call_args_list)
+        self.assertEqual(written, 8)
+
+    def test_flush_times_out_when_writes_stall(self):
+        """Test flush gives up after its timeout instead of blocking on a stuck write"""
+        release = threading.Event()
+        self.worksheet.append_rows.side_effect = lambda rows: release.wait()
+
+        self.sheets_api.enqueue_message(self._message(1))
+
+        self.assertFalse(self.sheets_api.flush(timeout=0.05))
+        release.set()
+        self.assertTrue(self.sheets_api.flush(timeout=5))
+
+    def test_writer_survives_api_failure(self):
+        """Test a failed write does not stop later messages being written"""
+        self.worksheet.append_rows.side_effect = [Exception("API error"), None]
+
+        self.sheets_api.enqueue_message(self._message(1))
+        self.sheets_api.flush()
+        self.sheets_api.enqueue_message(self._message(2))
+        self.sheets_api.flush()
+
+        self.assertEqual(self.worksheet.append_rows.call_count, 2)
+
+    def _api_error(self, status_code):
+        error = Exception(f"HTTP {status_code}")
+        error.response = Mock(status_code=status_code)
+        return error
+
+    @patch('utils.sheets_api.time.sleep')
+    def test_rate_limited_write_retried(self, sleep):
+        """Test a write rejected with 429 is retried after a backoff"""
+        self.worksheet.append_rows.side_effect = [self._api_error(429), self._api_error(429), None]
+
+        self.sheets_api.append_messages([self._message(1)])
+
+        self.assertEqual(self.worksheet.append_rows.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+
+    @patch('utils.sheets_api.time.sleep')
+    def test_append_not_retried_on_server_error(self, sleep):
+        """Test an append failing with 5xx is not repeated, as the rows may already be written"""
+        self.worksheet.append_rows.side_effect = self._api_error(503)
+
+        with self.assertRaises(Exception):
+            self.sheets_api.append_messages([self._message(1)])
+
+        self.assertEqual(self.worksheet.append_rows.call_count, 1)
+        sleep.assert_not_called()
+
+    @patch('utils.sheets_api.time.sleep')
+    def test_idempotent_write_retried_on_server_error(self, sleep):
+        """Test a write that is safe to repeat is retried after a 5xx"""
+        update = Mock(side_effect=[self._api_error(503), 'ok'])
+
+        self.assertEqual(self.sheets_api._call_with_retry(update, {}, idempotent=True), 'ok')
+        self.assertEqual(update.call_count, 2)
+
+    @patch('utils.sheets_api.time.sleep')
+    def test_client_error_not_retried(self, sleep):
+        """Test a write rejected with 400 fails without retrying"""
+        self.worksheet.append_rows.side_effect = self._api_error(400)
+
+        with self.assertRaises(Exception):
+            self.sheets_api.append_messages([self._message(1)])
+
+        self.assertEqual(self.worksheet.append_rows.call_count, 1)
+        sleep.assert_not_called()
+
+    def test_get_session_messages_fetches_only_session_rows(self):
+        """Test only the requested session's rows are fetched, in timestamp order"""
+        self.sheets_api.spreadsheet = Mock()
+        self.worksheet.col_values.return_value = [
+            'session_id', 'test_session', 'other_session', 'test_session', 'test_session'
+        ]
+        self.sheets_api.spreadsheet.values_batch_get.return_value = {'valueRanges': [
+            {'values': [['test_session', '2025-08-30T10:00:02', 'assistant', 'Reply', '{"source": "llm"}']]},
+            {'values': [
+                ['test_session', '2025-08-30T10:00:01', 'user', 'Hello'],
+                ['test_session', '2025-08-30T10:00:03', 'user', 'Thanks', '']
+            ]}
+        ]}
+
+        messages = self.sheets_api.get_session_messages('test_session')
+
+        self.sheets_api.spreadsheet.values_batch_get.assert_called_once_with(
+            ["'chat_messages'!A2:E2", "'chat_messages'!A4:E5"]
+        )
+        self.assertEqual([m['content'] for m in messages], ['Hello', 'Reply', 'Thanks'])
+        self.assertEqual(messages[1]['metadata'], {'source': 'llm'})
+
+    @patch('utils.sheets_api.MAX_SESSION_READ_RANGES', 1)
+    def test_get_session_messages_scattered_rows_read_at_once(self):
+        """Test a session split over many runs is read with one whole-sheet request"""
+        self.sheets_api.spreadsheet = Mock()
+        self.worksheet.col_values.return_value = [
+            'session_id', 'test_session', 'other_session', 'test_session'
+        ]
+        self.worksheet.get.return_value = [
+            ['test_session', '2025-08-30T10:00:01', 'user', 'Hello'],
+            ['other_session', '2025-08-30T10:00:02', 'user', 'Not mine'],
+            ['test_session', '2025-08-30T10:00:03', 'assistant', 'Reply']
+        ]
+
+        messages = self.sheets_api.get_session_messages('test_session')
+
+        self.sheets_api.spreadsheet.values_batch_get.assert_not_called()
+        self.worksheet.get.assert_called_once_with('A2:E')
+        self.assertEqual([m['content'] for m in messages], ['Hello', 'Reply'])
+
+    def test_get_recent_activity_counts_recent_rows(self):
+        """Test only messages newer than the cutoff are counted"""
+        from datetime import datetime, timedelta
+        recent = (datetime.now() - timedelta(days=1)).isoformat()
+        old = (datetime.now() - timedelta(days=30)).isoformat()
+        self.worksheet.get.return_value = [
+            ['a', recent, 'user'],
+            ['a', recent, 'assistant'],
+            ['b', recent, 'user'],
+            ['c', old, 'user'],
+            ['d', 'not a date', 'user'],
+            ['e']
+        ]
+
+        activity = self.sheets_api.get_recent_activity(days=7)
+
+        self.worksheet.get.assert_called_once_with('A2:C')
+
+        self.assertEqual(activity['unique_sessions'], 2)
+        self.assertEqual(activity['total_messages'], 3)
+        self.assertEqual(activity['user_messages'], 2)
+        self.assertEqual(activity['bot_messages'], 1)
+        self.assertEqual(activity['avg_messages_per_session'], 1.5)
+
+    def _export(self, message_count):
+        return {
+            'session_id': 'test_session',
+            'export_timestamp': '2025-08-30T10:05:00',
+            'messages': [self._message(index % 10) for index in range(message_count)]
+        }
+
+    def test_small_export_stored_as_json(self):
+        """Test an export that fits in one cell is stored as readable JSON"""
+        self.sheets_api.worksheets['chat_exports'] = exports = Mock()
+        export_data = self._export(2)
+
+        self.sheets_api.save_chat_export(export_data)
+
+        cell = exports.append_row.call_args[0][0][4]
+        self.assertTrue(cell.startswith('{'))
+        self.assertEqual(decode_export_cell(cell), export_data)
+
+    def test_large_export_compressed_to_fit_cell(self):
+        """Test an export too long for one cell is compressed and still decodes"""
+        self.sheets_api.worksheets['chat_exports'] = exports = Mock()
+        export_data = self._export(2000)
+
+        self.sheets_api.save_chat_export(export_data)
+
+        cell = exports.append_row.call_args[0][0][4]
+        self.assertLessEqual(len(cell), CELL_CHARACTER_LIMIT)
+        self.assertEqual(decode_export_cell(cell), export_data)
+
+    @patch('utils.sheets_api.CELL_CHARACTER_LIMIT', 500)
+    def test_export_too_large_after_compression_rejected(self):
+        """Test an export that does not fit even compressed raises before writing"""
+        self.sheets_api.worksheets['chat_exports'] = exports = Mock()
+        export_data = self._export(1)
+        export_data['messages'][0]['content'] = base64.b64encode(os.urandom(2000)).decode('ascii')
+
+        with self.assertRaises(SheetsAPIError):
+            self.sheets_api.save_chat_export(export_data)
+
+        exports.append_row.assert_not_called()
+
+class TestSheetsAPISetup(unittest.TestCase):
+
+    def setUp(self):
+        """Create an offline SheetsAPI wired to a mocked spreadsheet"""
+        with patch('utils.sheets_api.GSPREAD_AVAILABLE', False):
+            self.sheets_api = SheetsAPI()
+        self.spreadsheet = Mock()
+        self.sheets_api.spreadsheet = self.spreadsheet
+
+    def _worksheet(self, title):
+        worksheet = Mock()
+        worksheet.title = title
+        return worksheet
+
+    def test_headers_checked_and_fixed_in_batches(self):
+        """Test header rows are read with one request and repaired with one more"""
+        self.spreadsheet.worksheets.return_value = [
+            self._worksheet('chat_messages'),
+            self._worksheet('chat_exports')
+        ]
+        self.spreadsheet.values_batch_get.return_value = {'valueRanges': [
+            {'values': [['session_id', 'timestamp', 'role', 'content', 'metadata', 'notes']]},
+            {}
+        ]}
+
+        self.sheets_api._setup_worksheets()
+
+        self.spreadsheet.values_batch_get.assert_called_once()
+        self.spreadsheet.add_worksheet.assert_called_once()
+        self.assertEqual(self.spreadsheet.add_worksheet.call_args[1]['title'], 'session_analytics')
+        updated = [item['range'] for item in self.spreadsheet.values_batch_update.call_args[0][0]['data']]
+        self.assertEqual(updated, ["'session_analytics'!A1", "'chat_exports'!A1"])
+        self.assertEqual(len(self.sheets_api.worksheets), 3)
+
+if __name__ == '__main__':
+    unittest.main()
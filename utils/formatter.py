@@ -1,7 +1,30 @@
-import json
+import html
+import re
 from datetime import datetime
 from typing import Dict, Any, List
 
+# Inline markdown supported in chat messages, compiled once at import
+_BOLD_RE = re.compile(r'\*\*(.+?)\*\*')
+_ITALIC_RE = re.compile(r'\*(?!\s)(.+?)\*')
+_CODE_RE = re.compile(r'`(.+?)`')
+# Only web and mail links; the URL is already HTML-escaped, so it is safe in the attribute
+_LINK_RE = re.compile(r'\[([^\]]+)\]\(((?:https?://|mailto:)[^\s)]+)\)')
+
+# Block markdown, matched one line at a time
+_HEADING_RE = re.compile(r'(#{1,6})\s+(.*)')
+_BULLET_RE = re.compile(r'\s*[-*+]\s+(.*)')
+_NUMBERED_RE = re.compile(r'\s*\d+[.)]\s+(.*)')
+
+# Anything that may need markdown rendering; text without it is only escaped
+_MARKUP_RE = re.compile(r'[*`\[]|^\s*(?:#|[-+]\s|\d+[.)]\s)', re.MULTILINE)
+
+# Placeholder for a stashed code span; '<' never survives html.escape, so
+# these cannot collide with message text
+_CODE_SLOT_RE = re.compile(r'<(\d+)>')
+
+# Characters that are not allowed in file names, mapped to underscores
+_FILENAME_TRANSLATION = str.maketrans({char: '_' for char in '<>:"/\\|?*'})
+
 def format_message(role: str, content: str, timestamp: str = None) -> Dict[str, Any]:
     """
     Format a chat message for display and storage.
@@ -23,6 +46,91 @@ def format_message(role: str, content: str, timestamp: str = None) -> Dict[str,
         "timestamp": timestamp
     }
 
+def _format_inline(text: str) -> str:
+    """Render inline code, links, bold and italic in one escaped line"""
+    if '*' not in text and '`' not in text and '[' not in text:
+        return text
+    
+    # Inline code is literal: stash code spans before applying emphasis so
+    # asterisks inside them neither render nor pair with ones outside
+    code_spans = []
+    
+    def stash_code(match):
+        code_spans.append(match.group(1))
+        return f'<{len(code_spans) - 1}>'
+    
+    text = _CODE_RE.sub(stash_code, text)
+    text = _LINK_RE.sub(r'<a href="\2" target="_blank" rel="noopener noreferrer">\1</a>', text)
+    text = _BOLD_RE.sub(r'<strong>\1</strong>', text)
+    text = _ITALIC_RE.sub(r'<em>\1</em>', text)
+    if code_spans:
+        text = _CODE_SLOT_RE.sub(lambda match: f'<code>{code_spans[int(match.group(1))]}</code>', text)
+    return text
+
+def format_message_content(content: str) -> str:
+    """
+    Convert chat message content to HTML for display.
+    
+    The content is HTML-escaped first, so only the markdown below is rendered.
+    
+    Args:
+        content: The raw message content (may contain basic markdown)
+        
+    Returns:
+        HTML with headings, bullet and numbered lists, links, bold, italic,
+        inline code and line breaks rendered
+    """
+    text = html.escape(content)
+    
+    # Most messages are plain prose; skip the markdown passes entirely
+    if not _MARKUP_RE.search(text):
+        return text.replace('\n', '<br>')
+    
+    # Consecutive text lines are joined with <br>; headings and lists are
+    # blocks of their own, so blank lines around them are dropped
+    blocks = []
+    lines = []
+    list_tag = None
+    
+    def end_list():
+        nonlocal list_tag
+        if list_tag:
+            blocks.append(f'</{list_tag}>')
+            list_tag = None
+    
+    def end_lines(before_block=True):
+        while before_block and lines and not lines[-1]:
+            lines.pop()
+        if lines:
+            blocks.append('<br>'.join(lines))
+            lines.clear()
+    
+    for line in text.split('\n'):
+        heading = _HEADING_RE.match(line)
+        item = None if heading else _BULLET_RE.match(line) or _NUMBERED_RE.match(line)
+        if heading:
+            end_lines()
+            end_list()
+            level = len(heading.group(1))
+            blocks.append(f'<h{level}>{_format_inline(heading.group(2))}</h{level}>')
+        elif item:
+            end_lines()
+            tag = 'ol' if item.re is _NUMBERED_RE else 'ul'
+            if tag != list_tag:
+                end_list()
+                blocks.append(f'<{tag}>')
+                list_tag = tag
+            blocks.append(f'<li>{_format_inline(item.group(1))}</li>')
+        elif line or lines:
+            end_list()
+            lines.append(_format_inline(line))
+        elif not blocks:
+            # Leading blank lines are kept, as in plain text
+            lines.append(line)
+    end_lines(before_block=False)
+    end_list()
+    return ''.join(blocks)
+
 def format_career_recommendation(career: Dict[str, Any]) -> str:
     """
     Format a career recommendation for display.
@@ -72,10 +180,5 @@ def sanitize_filename(filename: str) -> str:
     Returns:
         Sanitized filename
     """
-    import re
-    # Remove or replace invalid characters
-    sanitized = re.sub(r'[<>:"/\\|?*]', '_', filename)
-    # Limit length
-    if len(sanitized) > 100:
-        sanitized = sanitized[:100]
-    return sanitized
+    # Replace invalid characters and limit length
+    return filename.translate(_FILENAME_TRANSLATION)[:100]
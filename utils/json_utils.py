@@ -0,0 +1,46 @@
+import json
+from typing import Any, Union
+
+# orjson is considerably faster than the standard library; fall back to
+# json when it is not installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Parse a JSON document.
+    
+    Args:
+        data: JSON text as str or bytes
+        
+    Returns:
+        The decoded Python object
+        
+    Raises:
+        ValueError: If the document is not valid JSON
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """
+    Serialize an object to UTF-8 encoded JSON.
+    
+    Args:
+        obj: JSON-serializable object
+        indent: Pretty-print with two-space indentation
+        
+    Returns:
+        The encoded JSON document as bytes
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    # Match orjson's compact output
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
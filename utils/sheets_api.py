@@ -1,9 +1,18 @@
+import atexit
+import base64
+import gzip
 import os
 import json
-from typing import Dict, List, Any, Optional
+import queue
+import random
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple
 import streamlit as st
 from datetime import datetime
 import logging
+from utils import json_utils
+from utils.errors import SheetsAPIError
 
 try:
     import gspread
@@ -12,6 +21,88 @@ try:
 except ImportError:
     GSPREAD_AVAILABLE = False
 
+# Maximum number of queued messages written per API request
+WRITE_BATCH_SIZE = 50
+
+# Maximum number of messages waiting to be written; enqueue blocks beyond this
+WRITE_QUEUE_SIZE = 1000
+
+# Google Sheets rejects cells longer than this many characters
+CELL_CHARACTER_LIMIT = 50000
+
+# Marks an export cell stored as base64-encoded gzip JSON
+COMPRESSED_EXPORT_PREFIX = 'GZB64:'
+
+# Ranges fetched in one batch GET; a session scattered over more runs than
+# this is read with a single whole-sheet request instead, keeping the URL short
+MAX_SESSION_READ_RANGES = 100
+
+# Seconds the exit hook waits for queued messages before giving up on them
+EXIT_FLUSH_TIMEOUT = 5
+
+# Attempts made for a write that fails with a rate limit (or, when safe to repeat, a server error)
+WRITE_RETRY_ATTEMPTS = 5
+
+# Seconds before the first retry; doubled (plus jitter) for each later one
+WRITE_RETRY_INITIAL_DELAY = 0.5
+
+def _compact_json(value: Any) -> str:
+    """Serialize a cell value as JSON without optional whitespace or ASCII escaping"""
+    return json_utils.dumps(value).decode('utf-8')
+
+def _encode_export(export_data: Dict[str, Any]) -> str:
+    """Encode export data for one cell, compressing it only when plain JSON will not fit"""
+    encoded = json_utils.dumps(export_data)
+    text = encoded.decode('utf-8')
+    if len(text) <= CELL_CHARACTER_LIMIT:
+        return text
+    compressed = COMPRESSED_EXPORT_PREFIX + base64.b64encode(
+        gzip.compress(encoded, compresslevel=6)).decode('ascii')
+    if len(compressed) > CELL_CHARACTER_LIMIT:
+        # Checked before any request, since Sheets would reject the whole row
+        raise SheetsAPIError(
+            f"Export is too large for one cell even when compressed "
+            f"({len(compressed)} > {CELL_CHARACTER_LIMIT} characters)"
+        )
+    return compressed
+
+def decode_export_cell(cell: str) -> Any:
+    """
+    Decode an export_data cell written by save_chat_export.
+    
+    Args:
+        cell: Cell value, either plain JSON or compressed with COMPRESSED_EXPORT_PREFIX
+        
+    Returns:
+        The export data
+    """
+    if cell.startswith(COMPRESSED_EXPORT_PREFIX):
+        return json_utils.loads(gzip.decompress(base64.b64decode(cell[len(COMPRESSED_EXPORT_PREFIX):])))
+    return json_utils.loads(cell)
+
+def _is_transient_error(error: Exception, idempotent: bool) -> bool:
+    """
+    Check whether a failed API call is safe and worth retrying.
+    
+    A rate limit (429) means the request was rejected, so any call can be retried.
+    A server error (5xx) may arrive after the change was committed, so it is only
+    retried for calls that can safely run twice.
+    """
+    status_code = getattr(getattr(error, 'response', None), 'status_code', None)
+    if not isinstance(status_code, int):
+        return False
+    return status_code == 429 or (idempotent and status_code >= 500)
+
+def _contiguous_runs(numbers: List[int]) -> List[Tuple[int, int]]:
+    """Collapse sorted row numbers into (first, last) runs of consecutive rows"""
+    runs = []
+    for number in numbers:
+        if runs and runs[-1][1] == number - 1:
+            runs[-1] = (runs[-1][0], number)
+        else:
+            runs.append((number, number))
+    return runs
+
 class SheetsAPI:
     """
     Google Sheets API helper class for storing and retrieving chat data
@@ -23,6 +114,12 @@ class SheetsAPI:
         self.spreadsheet = None
         self.worksheets = {}
         
+        # Background writer state (thread is started on first enqueue)
+        self._write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._writer_thread = None
+        # The instance is shared across sessions, each enqueueing from its own thread
+        self._writer_lock = threading.Lock()
+        
         if not GSPREAD_AVAILABLE:
             self.logger.warning("gspread not available. Running in offline mode.")
             return
@@ -127,28 +224,56 @@ class SheetsAPI:
             ]
         }
         
+        # One request lists the existing worksheets instead of a lookup per sheet
+        existing_sheets = {worksheet.title: worksheet for worksheet in self.spreadsheet.worksheets()}
+        
+        header_updates = []
+        sheets_to_check = []
         for sheet_name, headers in required_sheets.items():
-            try:
-                # Try to get existing worksheet
-                worksheet = self.spreadsheet.worksheet(sheet_name)
-                self.worksheets[sheet_name] = worksheet
-                
-                # Check if headers exist, add if not
-                existing_headers = worksheet.row_values(1)
-                if not existing_headers or existing_headers != headers:
-                    worksheet.update('A1', [headers])
-                    self.logger.info(f"Updated headers for {sheet_name}")
-                    
-            except gspread.WorksheetNotFound:
-                # Create new worksheet
+            worksheet = existing_sheets.get(sheet_name)
+            if worksheet is None:
+                # Create new worksheet; its headers are written with the batch below
                 worksheet = self.spreadsheet.add_worksheet(
                     title=sheet_name, 
                     rows=1000, 
                     cols=len(headers)
                 )
-                worksheet.update('A1', [headers])
-                self.worksheets[sheet_name] = worksheet
+                header_updates.append({'range': f"'{sheet_name}'!A1", 'values': [headers]})
                 self.logger.info(f"Created worksheet: {sheet_name}")
+            else:
+                sheets_to_check.append(sheet_name)
+            self.worksheets[sheet_name] = worksheet
+        
+        # Read every existing header row in a single request
+        if sheets_to_check:
+            value_ranges = self.spreadsheet.values_batch_get(
+                [f"'{sheet_name}'!1:1" for sheet_name in sheets_to_check]
+            ).get('valueRanges', [])
+            for sheet_name, value_range in zip(sheets_to_check, value_ranges):
+                rows = value_range.get('values') or [[]]
+                headers = required_sheets[sheet_name]
+                # Extra columns after ours are left alone; writing at A1 would
+                # not remove them, so an exact match would rewrite on every start
+                if rows[0][:len(headers)] != headers:
+                    header_updates.append({'range': f"'{sheet_name}'!A1", 'values': [headers]})
+                    self.logger.info(f"Updated headers for {sheet_name}")
+        
+        # Write all missing or outdated headers in a single request
+        if header_updates:
+            self._call_with_retry(self.spreadsheet.values_batch_update, {
+                'valueInputOption': 'RAW',
+                'data': header_updates
+            }, idempotent=True)
+    
+    def _message_to_row(self, message_data: Dict[str, Any]) -> List[Any]:
+        """Convert message data to a chat_messages worksheet row"""
+        return [
+            message_data.get('session_id', ''),
+            message_data.get('timestamp', ''),
+            message_data.get('role', ''),
+            message_data.get('content', ''),
+            message_data.get('metadata', '')
+        ]
     
     def append_message(self, message_data: Dict[str, Any]):
         """Append a chat message to the messages worksheet"""
@@ -158,19 +283,105 @@ class SheetsAPI:
         
         try:
             worksheet = self.worksheets['chat_messages']
-            row_data = [
-                message_data.get('session_id', ''),
-                message_data.get('timestamp', ''),
-                message_data.get('role', ''),
-                message_data.get('content', ''),
-                message_data.get('metadata', '')
-            ]
-            worksheet.append_row(row_data)
-            self.logger.info(f"Appended message for session {message_data.get('session_id', '')[:8]}")
+            self._call_with_retry(worksheet.append_row, self._message_to_row(message_data))
+            # Lazy %-formatting: this runs per message and INFO is often disabled
+            self.logger.info("Appended message for session %.8s", message_data.get('session_id', ''))
         except Exception as e:
             self.logger.error(f"Failed to append message: {e}")
             raise
     
+    def _call_with_retry(self, write, *args, idempotent: bool = False, **kwargs):
+        """
+        Call a Sheets write, retrying transient failures with exponential backoff.
+        
+        Args:
+            write: Bound gspread method to call, e.g. worksheet.append_rows
+            idempotent: Whether repeating the call is harmless; appends are not,
+                so they are only retried on rate limits
+            
+        Returns:
+            The result of the write
+        """
+        delay = WRITE_RETRY_INITIAL_DELAY
+        for attempt in range(1, WRITE_RETRY_ATTEMPTS + 1):
+            try:
+                return write(*args, **kwargs)
+            except Exception as e:
+                if attempt == WRITE_RETRY_ATTEMPTS or not _is_transient_error(e, idempotent):
+                    raise
+                self.logger.warning("Sheets write failed (attempt %d), retrying: %s", attempt, e)
+                time.sleep(delay + random.uniform(0, delay))
+                delay *= 2
+    
+    def append_messages(self, messages_data: List[Dict[str, Any]]):
+        """Append multiple chat messages to the messages worksheet in a single request"""
+        if not messages_data:
+            return
+        
+        if not self.client or 'chat_messages' not in self.worksheets:
+            self.logger.warning("Cannot append messages - sheets not initialized")
+            return
+        
+        try:
+            worksheet = self.worksheets['chat_messages']
+            self._call_with_retry(worksheet.append_rows, [self._message_to_row(m) for m in messages_data])
+            self.logger.info("Appended %d messages", len(messages_data))
+        except Exception as e:
+            self.logger.error(f"Failed to append messages: {e}")
+            raise
+    
+    def enqueue_message(self, message_data: Dict[str, Any]):
+        """Queue a chat message to be written by the background writer thread"""
+        with self._writer_lock:
+            if self._writer_thread is None:
+                self._writer_thread = threading.Thread(target=self._write_loop, daemon=True)
+                self._writer_thread.start()
+                # The writer is a daemon thread, so drain the queue before the interpreter exits
+                atexit.register(self._flush_at_exit)
+        self._write_queue.put(message_data)
+    
+    def _write_loop(self):
+        """Drain queued messages and write them to the sheet in batches"""
+        while True:
+            batch = [self._write_queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            try:
+                self.append_messages(batch)
+            except Exception:
+                # append_messages already logged the failure
+                pass
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until all queued messages have been written.
+        
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+            
+        Returns:
+            True if the queue drained, False if the timeout expired first
+        """
+        all_tasks_done = self._write_queue.all_tasks_done
+        with all_tasks_done:
+            return all_tasks_done.wait_for(
+                lambda: not self._write_queue.unfinished_tasks, timeout
+            )
+    
+    def _flush_at_exit(self):
+        """Give queued messages a bounded chance to be written before shutdown"""
+        if not self.flush(timeout=EXIT_FLUSH_TIMEOUT):
+            self.logger.warning(
+                "Dropping %d unwritten messages at exit", self._write_queue.unfinished_tasks
+            )
+    
     def save_chat_export(self, export_data: Dict[str, Any]):
         """Save chat export data"""
         if not self.client or 'chat_exports' not in self.worksheets:
@@ -184,9 +395,9 @@ class SheetsAPI:
                 export_data.get('session_id', ''),
                 export_data.get('export_timestamp', ''),
                 len(export_data.get('messages', [])),
-                json.dumps(export_data)
+                _encode_export(export_data)
             ]
-            worksheet.append_row(row_data)
+            self._call_with_retry(worksheet.append_row, row_data)
             self.logger.info(f"Saved export for session {export_data.get('session_id', '')[:8]}")
         except Exception as e:
             self.logger.error(f"Failed to save export: {e}")
@@ -199,16 +410,34 @@ class SheetsAPI:
         
         try:
             worksheet = self.worksheets['chat_messages']
-            records = worksheet.get_all_records()
+            # Locate the session's rows from the session_id column alone
+            session_ids = worksheet.col_values(1)
+            row_numbers = [
+                row_number for row_number, value in enumerate(session_ids, 1)
+                if row_number > 1 and value == session_id  # Skip header
+            ]
+            if not row_numbers:
+                return []
+            
+            # Then fetch only those rows, one range per contiguous run, in one request
+            runs = _contiguous_runs(row_numbers)
+            if len(runs) > MAX_SESSION_READ_RANGES:
+                rows = worksheet.get('A2:E')
+            else:
+                value_ranges = self.spreadsheet.values_batch_get([
+                    f"'chat_messages'!A{first}:E{last}" for first, last in runs
+                ]).get('valueRanges', [])
+                rows = [row for value_range in value_ranges for row in value_range.get('values', [])]
             
             session_messages = []
-            for record in records:
-                if record['session_id'] == session_id:
+            for row in rows:
+                if row and row[0] == session_id:
+                    _, timestamp, role, content, metadata = (row + [''] * 5)[:5]
                     session_messages.append({
-                        'timestamp': record['timestamp'],
-                        'role': record['role'],
-                        'content': record['content'],
-                        'metadata': json.loads(record['metadata']) if record['metadata'] else {}
+                        'timestamp': timestamp,
+                        'role': role,
+                        'content': content,
+                        'metadata': json_utils.loads(metadata) if metadata else {}
                     })
             
             return sorted(session_messages, key=lambda x: x['timestamp'])
@@ -231,10 +460,10 @@ class SheetsAPI:
                 session_data.get('end_time', datetime.now().isoformat()),
                 session_data.get('message_count', 0),
                 session_data.get('unique_intents', 0),
-                json.dumps(session_data.get('topics', [])),
-                json.dumps(session_data.get('summary', {}))
+                _compact_json(session_data.get('topics', [])),
+                _compact_json(session_data.get('summary', {}))
             ]
-            worksheet.append_row(row_data)
+            self._call_with_retry(worksheet.append_row, row_data)
             self.logger.info(f"Saved analytics for session {session_data.get('session_id', '')[:8]}")
         except Exception as e:
             self.logger.error(f"Failed to save analytics: {e}")
@@ -246,8 +475,10 @@ class SheetsAPI:
         
         try:
             worksheet = self.worksheets['chat_messages']
-            session_ids = worksheet.col_values(1)[1:]  # Skip header
-            return list(set(session_ids))  # Remove duplicates
+            session_ids = iter(worksheet.col_values(1))
+            next(session_ids, None)  # Skip header
+            # De-duplicate in one pass, ignoring blank cells
+            return list({session_id for session_id in session_ids if session_id})
         except Exception as e:
             self.logger.error(f"Failed to get sessions: {e}")
             return []
@@ -258,25 +489,28 @@ class SheetsAPI:
             return {}
         
         try:
-            from datetime import datetime, timedelta
+            import pandas as pd
+            from datetime import timedelta
             
-            cutoff_date = datetime.now() - timedelta(days=days)
             worksheet = self.worksheets['chat_messages']
-            records = worksheet.get_all_records()
+            # Only the session_id, timestamp and role columns are needed
+            records = pd.DataFrame(
+                worksheet.get('A2:C'), columns=['session_id', 'timestamp', 'role']
+            )
             
-            recent_records = []
-            for record in records:
-                try:
-                    msg_time = datetime.fromisoformat(record['timestamp'].replace('Z', '+00:00'))
-                    if msg_time > cutoff_date:
-                        recent_records.append(record)
-                except:
-                    continue
+            # Parse every timestamp in one vectorized pass; unparseable ones become NaT.
+            # Naive timestamps (as written by the app) are compared as-is against
+            # the local cutoff, so both sides are labelled UTC without shifting
+            timestamps = pd.to_datetime(
+                records['timestamp'].astype(str), format='ISO8601', errors='coerce', utc=True
+            )
+            cutoff_date = pd.Timestamp(datetime.now() - timedelta(days=days), tz='UTC')
+            recent_records = records[timestamps > cutoff_date]
             
             # Analyze recent activity
-            unique_sessions = len(set(r['session_id'] for r in recent_records))
+            unique_sessions = int(recent_records['session_id'].nunique())
             total_messages = len(recent_records)
-            user_messages = len([r for r in recent_records if r['role'] == 'user'])
+            user_messages = int((recent_records['role'] == 'user').sum())
             
             return {
                 'days_analyzed': days,
@@ -306,7 +540,7 @@ class SheetsAPI:
         try:
             if self.spreadsheet:
                 # Try to access a worksheet
-                test_sheet = list(self.worksheets.values())[0] if self.worksheets else None
+                test_sheet = next(iter(self.worksheets.values()), None)
                 if test_sheet:
                     test_sheet.get('A1:A1')  # Simple read test
                     health_status['read_test'] = True
@@ -20,6 +20,13 @@ def print_section(title):
     print(f"  {title}")
     print(f"{'-'*40}")
 
+def get_file_size(file_path):
+    """Return the size of a file in bytes, or None if it does not exist"""
+    try:
+        return os.stat(file_path).st_size
+    except OSError:
+        return None
+
 def test_core_modules():
     """Test all core modules"""
     print_section("Testing Core Modules")
@@ -117,8 +124,8 @@ def test_data_files():
     
     print("Required files:")
     for file_path in required_files:
-        if os.path.exists(file_path):
-            size = os.path.getsize(file_path)
+        size = get_file_size(file_path)
+        if size is not None:
             print(f"✅ {file_path} ({size} bytes)")
             results["required"][file_path] = True
         else:
@@ -127,8 +134,8 @@ def test_data_files():
     
     print("\nOptional files:")
     for file_path in optional_files:
-        if os.path.exists(file_path):
-            size = os.path.getsize(file_path)
+        size = get_file_size(file_path)
+        if size is not None:
             print(f"✅ {file_path} ({size} bytes)")
             results["optional"][file_path] = True
         else: